@@ -3,9 +3,22 @@ ASGI config for expense_tracker project.
 """
 
 import os
+import threading
 
+from django.conf import settings
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'expense_tracker.settings')
+# Keep the middleware chain async: WhiteNoise would force it back to sync
+os.environ.setdefault('SERVE_STATIC', 'False')
 
 application = get_asgi_application()
+
+if settings.WARMUP_ON_BOOT:
+    from .readiness import warm_up
+
+    # Servers such as uvicorn import the application inside their event
+    # loop, where the ORM refuses to run, so warm up from a plain thread
+    thread = threading.Thread(target=warm_up, name='warm-up')
+    thread.start()
+    thread.join()
@@ -0,0 +1,51 @@
+"""
+SQLite backend with per-connection pragmas and configurable transaction mode.
+
+Backports the ``init_command`` and ``transaction_mode`` OPTIONS that
+Django 5.1 added to its own SQLite backend:
+
+- ``init_command``: semicolon-separated statements (usually PRAGMAs) run
+  on every new connection.
+- ``transaction_mode``: ``DEFERRED``, ``IMMEDIATE`` or ``EXCLUSIVE``, used
+  for ``BEGIN`` when ``atomic()`` opens a transaction. ``IMMEDIATE`` takes
+  the write lock up front, so a transaction that reads before writing
+  waits on the busy timeout instead of failing with "database is locked"
+  when it tries to upgrade its lock.
+"""
+from django.core.exceptions import ImproperlyConfigured
+from django.db.backends.sqlite3 import base
+
+TRANSACTION_MODES = ('DEFERRED', 'IMMEDIATE', 'EXCLUSIVE')
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+
+    def get_connection_params(self):
+        kwargs = super().get_connection_params()
+        kwargs.pop('init_command', None)
+        transaction_mode = kwargs.pop('transaction_mode', None)
+        if transaction_mode is not None and transaction_mode.upper() not in TRANSACTION_MODES:
+            raise ImproperlyConfigured(
+                f'settings.DATABASES OPTIONS transaction_mode must be one of {", ".join(TRANSACTION_MODES)}.'
+            )
+        return kwargs
+
+    @property
+    def transaction_mode(self):
+        mode = self.settings_dict['OPTIONS'].get('transaction_mode')
+        return mode.upper() if mode else None
+
+    def get_new_connection(self, conn_params):
+        conn = super().get_new_connection(conn_params)
+        init_command = self.settings_dict['OPTIONS'].get('init_command', '')
+        for statement in init_command.split(';'):
+            statement = statement.strip()
+            if statement:
+                conn.execute(statement)
+        return conn
+
+    def _start_transaction_under_autocommit(self):
+        if self.transaction_mode is None:
+            super()._start_transaction_under_autocommit()
+        else:
+            self.cursor().execute(f'BEGIN {self.transaction_mode}')
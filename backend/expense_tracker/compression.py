@@ -0,0 +1,222 @@
+"""
+Negotiated response compression: zstd, brotli or gzip.
+
+The encoding is the first of COMPRESSION_ENCODINGS that the client accepts
+(by ``Accept-Encoding``, honouring ``q=0``) and that is available here;
+brotli and zstd need the optional ``Brotli`` and ``zstandard`` packages.
+Only compressible content types are touched, and bodies shorter than
+COMPRESSION_MIN_SIZE are sent as they are.
+
+Streaming responses (the export) are compressed as they are produced: the
+body is never collected in memory. Export rows arrive one at a time, so
+compressed output is flushed to the client every COMPRESSION_STREAM_FLUSH
+input bytes rather than per row, which would ruin the ratio.
+"""
+import re
+import zlib
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.utils.cache import patch_vary_headers
+
+try:
+    import brotli
+except ImportError:  # optional dependency
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:  # optional dependency
+    zstandard = None
+
+COMPRESSIBLE_TYPES = (
+    'application/json',
+    'application/x-ndjson',
+    'application/javascript',
+    'application/xml',
+    'text/',
+)
+_strong_etag = re.compile(r'^\s*"')
+
+
+class _Gzip:
+    def __init__(self, level):
+        # wbits 16+ writes the gzip header and trailer around the deflate stream
+        self._compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    def compress(self, data):
+        return self._compressor.compress(data)
+
+    def flush(self):
+        return self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self):
+        return self._compressor.flush(zlib.Z_FINISH)
+
+
+class _Brotli:
+    def __init__(self, level):
+        self._compressor = brotli.Compressor(quality=level)
+
+    def compress(self, data):
+        return self._compressor.process(data)
+
+    def flush(self):
+        return self._compressor.flush()
+
+    def finish(self):
+        return self._compressor.finish()
+
+
+class _Zstd:
+    def __init__(self, level):
+        self._compressor = zstandard.ZstdCompressor(level=level).compressobj()
+
+    def compress(self, data):
+        return self._compressor.compress(data)
+
+    def flush(self):
+        return self._compressor.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+
+    def finish(self):
+        return self._compressor.flush(zstandard.COMPRESSOBJ_FLUSH_FINISH)
+
+
+def available_encodings():
+    """{encoding: (compressor class, level setting)} for what can run here."""
+    encodings = {'gzip': (_Gzip, 'COMPRESSION_GZIP_LEVEL')}
+    if brotli is not None:
+        encodings['br'] = (_Brotli, 'COMPRESSION_BROTLI_LEVEL')
+    if zstandard is not None:
+        encodings['zstd'] = (_Zstd, 'COMPRESSION_ZSTD_LEVEL')
+    return encodings
+
+
+def parse_accept_encoding(header):
+    """{coding: q} from an Accept-Encoding header; malformed q-values count as 0."""
+    accepted = {}
+    for item in header.split(','):
+        coding, *params = [part.strip() for part in item.split(';')]
+        if not coding:
+            continue
+        q = 1.0
+        for param in params:
+            name, _, value = param.partition('=')
+            if name.strip().lower() == 'q':
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        accepted[coding.lower()] = q
+    return accepted
+
+
+def choose_encoding(header):
+    """The preferred available encoding the client accepts, or None."""
+    accepted = parse_accept_encoding(header)
+    encodings = available_encodings()
+    for coding in settings.COMPRESSION_ENCODINGS:
+        if coding in encodings and accepted.get(coding, accepted.get('*', 0)) > 0:
+            return coding
+    return None
+
+
+def compress_stream(chunks, compressor, flush_every):
+    """Compress an iterable of byte chunks, flushing after every ``flush_every`` input bytes."""
+    pending = 0
+    for chunk in chunks:
+        if not chunk:
+            continue
+        pending += len(chunk)
+        data = compressor.compress(chunk)
+        if pending >= flush_every:
+            data += compressor.flush()
+            pending = 0
+        if data:
+            yield data
+    yield compressor.finish()
+
+
+class CompressionMiddleware:
+    """
+    Compress JSON, NDJSON, CSV and text responses for clients that accept it.
+    Runs natively in sync and async handler chains.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        return self.compress(request, self.get_response(request))
+
+    async def __acall__(self, request):
+        return self.compress(request, await self.get_response(request))
+
+    def compress(self, request, response):
+        if not settings.COMPRESSION_ENABLED or not self.compressible(response):
+            return response
+
+        patch_vary_headers(response, ('Accept-Encoding',))
+        encoding = choose_encoding(request.META.get('HTTP_ACCEPT_ENCODING', ''))
+        if encoding is None:
+            return response
+        compressor_class, level_setting = available_encodings()[encoding]
+        compressor = compressor_class(getattr(settings, level_setting))
+
+        if response.streaming:
+            if response.is_async:
+                # Kept streaming; each async chunk is compressed as it arrives
+                response.streaming_content = self._compress_async(
+                    response.streaming_content, compressor, settings.COMPRESSION_STREAM_FLUSH
+                )
+            else:
+                response.streaming_content = compress_stream(
+                    response.streaming_content, compressor, settings.COMPRESSION_STREAM_FLUSH
+                )
+            del response['Content-Length']
+        else:
+            compressed = compressor.compress(response.content) + compressor.finish()
+            if len(compressed) >= len(response.content):
+                return response
+            response.content = compressed
+            response['Content-Length'] = str(len(compressed))
+
+        # The compressed representation is not byte-identical to the original
+        etag = response.get('ETag')
+        if etag and _strong_etag.match(etag):
+            response['ETag'] = 'W/' + etag
+        response['Content-Encoding'] = encoding
+        return response
+
+    @staticmethod
+    async def _compress_async(chunks, compressor, flush_every):
+        pending = 0
+        async for chunk in chunks:
+            if not chunk:
+                continue
+            pending += len(chunk)
+            data = compressor.compress(chunk)
+            if pending >= flush_every:
+                data += compressor.flush()
+                pending = 0
+            if data:
+                yield data
+        yield compressor.finish()
+
+    @staticmethod
+    def compressible(response):
+        if response.has_header('Content-Encoding') or response.status_code in (204, 206, 304):
+            return False
+        content_type = response.get('Content-Type', '').split(';')[0].strip().lower()
+        if not content_type.startswith(COMPRESSIBLE_TYPES):
+            return False
+        if response.streaming:
+            return True
+        return len(response.content) >= settings.COMPRESSION_MIN_SIZE
@@ -0,0 +1,266 @@
+"""
+Per-route request metrics, a Prometheus text endpoint and slow-request logging.
+
+RequestMetricsMiddleware times every request and, through a database
+execute wrapper, counts its queries and the time spent in them. Samples are
+recorded per (route, method), where route is the resolved URL name
+(``expense-list``, ``expense-total`` ...), so GET and POST on the list URL
+report as list and create.
+
+Counters are sharded per thread: each worker thread only ever writes its
+own shard, so recording takes no lock, and a scrape sums the shards. A lock
+is taken once per thread, to register its shard.
+"""
+import bisect
+import logging
+import threading
+import time
+from contextlib import asynccontextmanager
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import connection
+from django.http import HttpResponse
+from django.utils.crypto import constant_time_compare
+
+from .readiness import WARMUP_ENVIRON_KEY
+
+logger = logging.getLogger('expense_tracker.slow_requests')
+
+# Latency histogram upper bounds, in seconds
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# Statements listed in a slow-request log entry, slowest first
+SLOW_QUERIES_LOGGED = 10
+
+
+class RouteSeries:
+    """Counters for one (route, method), written by a single thread."""
+
+    __slots__ = ('buckets', 'count', 'seconds', 'queries', 'db_seconds', 'statuses')
+
+    def __init__(self):
+        self.buckets = [0] * (len(BUCKETS) + 1)
+        self.count = 0
+        self.seconds = 0.0
+        self.queries = 0
+        self.db_seconds = 0.0
+        self.statuses = {}
+
+    def merge(self, other):
+        for index, value in enumerate(other.buckets):
+            self.buckets[index] += value
+        self.count += other.count
+        self.seconds += other.seconds
+        self.queries += other.queries
+        self.db_seconds += other.db_seconds
+        for code, value in list(other.statuses.items()):
+            self.statuses[code] = self.statuses.get(code, 0) + value
+
+
+class MetricsRegistry:
+    """Thread-sharded request metrics."""
+
+    def __init__(self):
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._shards = []
+
+    def _shard(self):
+        shard = getattr(self._local, 'shard', None)
+        if shard is None:
+            shard = self._local.shard = {}
+            with self._lock:
+                self._shards.append(shard)
+        return shard
+
+    def observe(self, route, method, status, seconds, queries, db_seconds):
+        shard = self._shard()
+        series = shard.get((route, method))
+        if series is None:
+            series = shard[(route, method)] = RouteSeries()
+        series.buckets[bisect.bisect_left(BUCKETS, seconds)] += 1
+        series.count += 1
+        series.seconds += seconds
+        series.queries += queries
+        series.db_seconds += db_seconds
+        series.statuses[status] = series.statuses.get(status, 0) + 1
+
+    def snapshot(self):
+        """Return {(route, method): RouteSeries} summed over every thread."""
+        with self._lock:
+            shards = list(self._shards)
+        totals = {}
+        for shard in shards:
+            for key, series in list(shard.items()):
+                totals.setdefault(key, RouteSeries()).merge(series)
+        return totals
+
+    def reset(self):
+        with self._lock:
+            for shard in self._shards:
+                shard.clear()
+
+
+registry = MetricsRegistry()
+
+
+def _labels(**labels):
+    return ','.join(f'{name}="{value}"' for name, value in labels.items())
+
+
+def render_prometheus(snapshot):
+    """Format a registry snapshot in the Prometheus text exposition format."""
+    lines = [
+        '# HELP expenses_http_requests_total Requests handled, by route, method and status.',
+        '# TYPE expenses_http_requests_total counter',
+    ]
+    series = sorted(snapshot.items())
+    for (route, method), data in series:
+        for code, value in sorted(data.statuses.items()):
+            lines.append(f'expenses_http_requests_total{{{_labels(route=route, method=method, status=code)}}} {value}')
+    lines += [
+        '# HELP expenses_http_request_duration_seconds Time until the response is returned to the server.',
+        '# TYPE expenses_http_request_duration_seconds histogram',
+    ]
+    for (route, method), data in series:
+        cumulative = 0
+        for bound, value in zip(BUCKETS + ('+Inf',), data.buckets):
+            cumulative += value
+            labels = _labels(route=route, method=method, le=bound)
+            lines.append(f'expenses_http_request_duration_seconds_bucket{{{labels}}} {cumulative}')
+        labels = _labels(route=route, method=method)
+        lines.append(f'expenses_http_request_duration_seconds_sum{{{labels}}} {data.seconds:.6f}')
+        lines.append(f'expenses_http_request_duration_seconds_count{{{labels}}} {data.count}')
+    lines += [
+        '# HELP expenses_db_queries_total Database queries executed while handling requests.',
+        '# TYPE expenses_db_queries_total counter',
+    ]
+    for (route, method), data in series:
+        lines.append(f'expenses_db_queries_total{{{_labels(route=route, method=method)}}} {data.queries}')
+    lines += [
+        '# HELP expenses_db_query_duration_seconds_total Time spent in database queries while handling requests.',
+        '# TYPE expenses_db_query_duration_seconds_total counter',
+    ]
+    for (route, method), data in series:
+        lines.append(
+            f'expenses_db_query_duration_seconds_total{{{_labels(route=route, method=method)}}} {data.db_seconds:.6f}'
+        )
+    return '\n'.join(lines) + '\n'
+
+
+class QueryRecorder:
+    """Execute wrapper counting queries and their time, optionally keeping the SQL."""
+
+    def __init__(self, keep_sql):
+        self.count = 0
+        self.seconds = 0.0
+        self.statements = [] if keep_sql else None
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - started
+            self.count += 1
+            self.seconds += elapsed
+            if self.statements is not None:
+                self.statements.append((elapsed, sql))
+
+
+@asynccontextmanager
+async def recording_queries(recorder):
+    """
+    Async counterpart of ``connection.execute_wrapper(recorder)``. Database
+    connections are per thread, and under ASGI a request's queries (sync
+    views, the async ORM) run on its sync_to_async worker thread, not on
+    the event loop thread, so the wrapper is installed there.
+    """
+    await sync_to_async(lambda: connection.execute_wrappers.append(recorder))()
+    try:
+        yield recorder
+    finally:
+        await sync_to_async(lambda: connection.execute_wrappers.remove(recorder))()
+
+
+class RequestMetricsMiddleware:
+    """
+    Record latency, query count and DB time per route, and log requests
+    slower than SLOW_REQUEST_THRESHOLD_MS together with their slowest SQL.
+    Streaming responses are timed until the response object is returned.
+    Warm-up requests are not recorded. Runs natively in sync and async
+    handler chains.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    @staticmethod
+    def skip(request):
+        threshold = settings.SLOW_REQUEST_THRESHOLD_MS
+        return (not settings.METRICS_ENABLED and not threshold) or request.META.get(WARMUP_ENVIRON_KEY)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if self.skip(request):
+            return self.get_response(request)
+
+        recorder = QueryRecorder(keep_sql=bool(settings.SLOW_REQUEST_THRESHOLD_MS))
+        started = time.perf_counter()
+        with connection.execute_wrapper(recorder):
+            response = self.get_response(request)
+        self.record(request, response, time.perf_counter() - started, recorder)
+        return response
+
+    async def __acall__(self, request):
+        if self.skip(request):
+            return await self.get_response(request)
+
+        recorder = QueryRecorder(keep_sql=bool(settings.SLOW_REQUEST_THRESHOLD_MS))
+        started = time.perf_counter()
+        async with recording_queries(recorder):
+            response = await self.get_response(request)
+        self.record(request, response, time.perf_counter() - started, recorder)
+        return response
+
+    @staticmethod
+    def record(request, response, elapsed, recorder):
+        threshold = settings.SLOW_REQUEST_THRESHOLD_MS
+        match = getattr(request, 'resolver_match', None)
+        route = (match.view_name or match.route) if match else 'unmatched'
+        if settings.METRICS_ENABLED:
+            registry.observe(
+                route, request.method, response.status_code, elapsed, recorder.count, recorder.seconds
+            )
+        if threshold and elapsed * 1000 >= threshold:
+            slowest = sorted(recorder.statements, key=lambda item: item[0], reverse=True)
+            logger.warning(
+                'Slow request: %s %s (%s) took %.1fms with %d queries (%.1fms in the database)\n%s',
+                request.method, request.get_full_path(), route, elapsed * 1000,
+                recorder.count, recorder.seconds * 1000,
+                '\n'.join(f'  {seconds * 1000:.1f}ms {sql}' for seconds, sql in slowest[:SLOW_QUERIES_LOGGED]),
+            )
+
+
+def metrics_view(request):
+    """
+    Prometheus scrape endpoint; requires ``Authorization: Bearer METRICS_TOKEN``.
+    Without a token it is only served with DEBUG on.
+    """
+    if not settings.METRICS_ENABLED:
+        return HttpResponse(status=404)
+    token = settings.METRICS_TOKEN
+    if not token and not settings.DEBUG:
+        return HttpResponse('Set METRICS_TOKEN to serve /metrics.', status=403, content_type='text/plain')
+    if token and not constant_time_compare(request.headers.get('Authorization', ''), f'Bearer {token}'):
+        return HttpResponse(status=401)
+    return HttpResponse(
+        render_prometheus(registry.snapshot()),
+        content_type='text/plain; version=0.0.4; charset=utf-8'
+    )
@@ -0,0 +1,192 @@
+"""
+Opt-in per-request profiling.
+
+Nothing is profiled unless PROFILING_ENABLED is on. Then a request is
+profiled when it carries a valid ``X-Profile`` header (a token signed with
+SECRET_KEY, minted by ``manage.py request_profiles token``), or at random
+with probability PROFILING_SAMPLE_RATE. The view runs under cProfile with its SQL recorded,
+and the result is written to PROFILING_DIR as ``<id>.prof`` (pstats) plus
+``<id>.json`` (request details and query log). Only the newest
+PROFILING_MAX_PROFILES are kept. Profiled responses carry ``X-Profile-Id``.
+Streaming responses (the export) are profiled only until the response
+object is returned, not while the body is produced; their saved profile
+says so.
+
+Under ASGI the profiler runs on the event loop thread. Work the view hands
+to worker threads (sync views, the async ORM) shows up as waiting, and
+other requests the loop serves meanwhile are included.
+"""
+import cProfile
+import itertools
+import json
+import logging
+import os
+import random
+import time
+from pathlib import Path
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core import signing
+from django.db import connection
+
+from .metrics import QueryRecorder, recording_queries
+
+HEADER = 'X-Profile'
+SIGNING_SALT = 'expense_tracker.profiling'
+TOKEN_VALUE = 'profile'
+
+logger = logging.getLogger('expense_tracker.profiling')
+_sequence = itertools.count()
+
+
+def make_token():
+    """A header value that enables profiling for PROFILING_TOKEN_MAX_AGE seconds."""
+    return signing.TimestampSigner(salt=SIGNING_SALT).sign(TOKEN_VALUE)
+
+
+def token_is_valid(token):
+    try:
+        value = signing.TimestampSigner(salt=SIGNING_SALT).unsign(
+            token, max_age=settings.PROFILING_TOKEN_MAX_AGE
+        )
+    except signing.BadSignature:
+        return False
+    return value == TOKEN_VALUE
+
+
+def profile_dir():
+    return Path(settings.PROFILING_DIR)
+
+
+def list_profiles():
+    """Metadata of the stored profiles, oldest first."""
+    profiles = []
+    for path in sorted(profile_dir().glob('*.json')):
+        try:
+            profiles.append(json.loads(path.read_text()))
+        except (OSError, ValueError):
+            continue  # pruned or half-written by another worker
+    return profiles
+
+
+def save_profile(profiler, details):
+    """Write one profile and trim the ring to PROFILING_MAX_PROFILES."""
+    directory = profile_dir()
+    directory.mkdir(parents=True, exist_ok=True)
+    profile_id = details['id']
+    profiler.dump_stats(directory / f'{profile_id}.prof')
+    # The .json is written last and atomically; it marks the profile complete
+    partial = directory / f'{profile_id}.json.tmp'
+    partial.write_text(json.dumps(details, indent=2))
+    os.replace(partial, directory / f'{profile_id}.json')
+
+    stale = sorted(directory.glob('*.json'))[:-max(settings.PROFILING_MAX_PROFILES, 1)]
+    for path in stale:
+        for suffix in ('.json', '.prof'):
+            try:
+                (directory / (path.name[:-len('.json')] + suffix)).unlink()
+            except FileNotFoundError:
+                pass
+
+
+class RequestProfilingMiddleware:
+    """
+    Profile selected requests with cProfile and record their SQL. Runs
+    natively in sync and async handler chains; see the module docstring
+    for what an async profile covers.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def trigger(self, request):
+        if not settings.PROFILING_ENABLED:
+            return None
+        token = request.headers.get(HEADER)
+        if token and token_is_valid(token):
+            return 'header'
+        rate = settings.PROFILING_SAMPLE_RATE
+        if rate and random.random() < rate:
+            return 'sample'
+        return None
+
+    @staticmethod
+    def start():
+        """An enabled profiler, or None if one cannot run."""
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:
+            # Another profiler is active in this interpreter (Python 3.12+)
+            return None
+        return profiler
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        trigger = self.trigger(request)
+        profiler = self.start() if trigger else None
+        if profiler is None:
+            return self.get_response(request)
+        recorder = QueryRecorder(keep_sql=True)
+        started = time.perf_counter()
+        try:
+            with connection.execute_wrapper(recorder):
+                response = self.get_response(request)
+        finally:
+            profiler.disable()
+        return self.finish(request, response, trigger, profiler, recorder, time.perf_counter() - started)
+
+    async def __acall__(self, request):
+        trigger = self.trigger(request)
+        profiler = self.start() if trigger else None
+        if profiler is None:
+            return await self.get_response(request)
+        recorder = QueryRecorder(keep_sql=True)
+        started = time.perf_counter()
+        try:
+            async with recording_queries(recorder):
+                response = await self.get_response(request)
+        finally:
+            profiler.disable()
+        return self.finish(request, response, trigger, profiler, recorder, time.perf_counter() - started)
+
+    def finish(self, request, response, trigger, profiler, recorder, elapsed):
+        # Sortable: time first, then pid and a per-process sequence
+        profile_id = f'{time.time_ns()}-{os.getpid()}-{next(_sequence)}'
+        match = getattr(request, 'resolver_match', None)
+        details = {
+            'id': profile_id,
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+            'trigger': trigger,
+            'handler': 'async' if iscoroutinefunction(self) else 'sync',
+            'method': request.method,
+            'path': request.get_full_path(),
+            'route': (match.view_name or match.route) if match else 'unmatched',
+            'status': response.status_code,
+            'duration_ms': round(elapsed * 1000, 3),
+            'query_count': recorder.count,
+            'db_ms': round(recorder.seconds * 1000, 3),
+            'queries': [
+                {'ms': round(seconds * 1000, 3), 'sql': sql}
+                for seconds, sql in recorder.statements
+            ],
+        }
+        if response.streaming:
+            details['note'] = (
+                'Streaming response: profile, duration and queries stop when the response '
+                'object is returned, before its body is generated.'
+            )
+        try:
+            save_profile(profiler, details)
+        except OSError:
+            logger.exception('Could not save profile %s', profile_id)
+            return response
+        response['X-Profile-Id'] = profile_id
+        return response
@@ -0,0 +1,169 @@
+"""
+Readiness checks and worker warm-up.
+
+``GET /`` only says the process is up. ``GET /ready`` says it can serve:
+it times a ``SELECT 1`` round trip and checks that every migration on disk
+has been applied, answering 503 otherwise, so a load balancer keeps traffic
+away from a worker whose database is unreachable or whose schema is behind
+the code.
+
+warm_up() runs once per worker as the WSGI/ASGI application is loaded,
+before the server accepts connections. It opens the database connection,
+imports the DRF and serializer modules, populates the URL resolver and
+migration state, and sends WARMUP_PATHS through the full middleware stack,
+which fills the database page cache. The first real requests after a
+deploy then cost what steady-state requests cost. Response cache entries
+are keyed on the Host header, so they only serve real traffic when
+WARMUP_HOST names the host clients use. Warm-up requests carry
+WARMUP_ENVIRON_KEY in their WSGI environ and are left out of the request
+metrics.
+"""
+import importlib
+import logging
+import threading
+import time
+from wsgiref.util import setup_testing_defaults
+
+from django.conf import settings
+from django.core.handlers.wsgi import WSGIHandler
+from django.db import Error, connection
+from django.db.migrations.executor import MigrationExecutor
+from django.http import JsonResponse
+from django.urls import reverse
+
+logger = logging.getLogger('expense_tracker.readiness')
+
+# Imported up front instead of by the first request that needs them
+WARMUP_MODULES = (
+    'rest_framework.fields',
+    'rest_framework.serializers',
+    'rest_framework.renderers',
+    'rest_framework.parsers',
+    'rest_framework.negotiation',
+    'rest_framework.pagination',
+    'expenses.serializers',
+    'expenses.views',
+    'expenses.export',
+    'expenses.changes',
+    'expenses.search',
+)
+
+# Set in the environ of warm-up requests; not an HTTP header, so clients cannot send it
+WARMUP_ENVIRON_KEY = 'expense_tracker.warm_up'
+
+_migrations_applied = threading.Event()
+state = {'warmed_up': False, 'warm_up_ms': None}
+
+
+def database_latency():
+    """Seconds for a ``SELECT 1`` round trip, connecting first if needed."""
+    connection.ensure_connection()
+    started = time.perf_counter()
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT 1')
+        cursor.fetchone()
+    return time.perf_counter() - started
+
+
+def pending_migrations():
+    """
+    Labels of migrations on disk that are not applied. Once none are
+    pending the answer is remembered for the life of the process: a schema
+    is not un-migrated underneath a running worker.
+    """
+    if _migrations_applied.is_set():
+        return []
+    executor = MigrationExecutor(connection)
+    plan = executor.migration_plan(executor.loader.graph.leaf_nodes())
+    pending = [f'{migration.app_label}.{migration.name}' for migration, backwards in plan]
+    if not pending:
+        _migrations_applied.set()
+    return pending
+
+
+def readiness_view(request):
+    """200 when the database answers and the schema is current, else 503."""
+    body = {'status': 'ready', 'warmed_up': state['warmed_up']}
+    try:
+        latency = database_latency()
+        pending = pending_migrations()
+    except Error as error:
+        logger.warning('Readiness check failed: %r', error)
+        body.update(status='unavailable', database={'ok': False, 'error': type(error).__name__})
+        status = 503
+    else:
+        body['database'] = {'ok': True, 'vendor': connection.vendor, 'latency_ms': round(latency * 1000, 3)}
+        body['migrations'] = {'ok': not pending, 'pending': pending}
+        status = 200 if not pending else 503
+        if pending:
+            body['status'] = 'unavailable'
+    response = JsonResponse(body, status=status)
+    response['Cache-Control'] = 'no-store'
+    return response
+
+
+def _warmup_host():
+    """WARMUP_HOST, else a Host header that passes ALLOWED_HOSTS validation."""
+    if settings.WARMUP_HOST:
+        return settings.WARMUP_HOST
+    for host in settings.ALLOWED_HOSTS:
+        if '*' not in host:
+            return host.lstrip('.')
+    return 'localhost'
+
+
+def _request(handler, path, host):
+    path, _, query = path.partition('?')
+    environ = {
+        'REQUEST_METHOD': 'GET', 'PATH_INFO': path, 'QUERY_STRING': query,
+        'HTTP_HOST': host, 'HTTP_ACCEPT': 'application/json', 'wsgi.url_scheme': 'https',
+        WARMUP_ENVIRON_KEY: True,
+    }
+    setup_testing_defaults(environ)
+    response = handler(environ, lambda status, headers: None)
+    try:
+        for _ in response:
+            pass
+    finally:
+        response.close()
+    return response.status_code
+
+
+def warm_up(paths=None):
+    """
+    Prepare this process to serve. Failures are logged rather than raised:
+    a worker that could not warm up still serves, it is just slower at
+    first, and /ready reports the underlying problem.
+    Returns ``{path: status_code}`` for the warm-up requests.
+    """
+    started = time.perf_counter()
+    for module in WARMUP_MODULES:
+        importlib.import_module(module)
+    reverse('expense-list')
+
+    results = {}
+    try:
+        database_latency()
+        pending = pending_migrations()
+    except Error:
+        logger.exception('Warm-up could not reach the database')
+        return results
+    if pending:
+        logger.warning('Skipping warm-up requests; unapplied migrations: %s', ', '.join(pending))
+        return results
+
+    handler = WSGIHandler()
+    host = _warmup_host()
+    for path in settings.WARMUP_PATHS if paths is None else paths:
+        try:
+            results[path] = _request(handler, path, host)
+        except Exception:
+            logger.exception('Warm-up request to %s failed', path)
+            continue
+        if results[path] >= 400:
+            logger.warning('Warm-up request to %s returned %d', path, results[path])
+
+    elapsed_ms = round((time.perf_counter() - started) * 1000, 3)
+    state.update(warmed_up=True, warm_up_ms=elapsed_ms)
+    logger.info('Warmed up in %.1fms: %s', elapsed_ms, results)
+    return results
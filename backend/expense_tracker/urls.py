@@ -4,11 +4,16 @@ URL configuration for expense_tracker project.
 from django.urls import path, include
 from django.http import JsonResponse
 
+from .metrics import metrics_view
+from .readiness import readiness_view
+
 def health_check(request):
     """Health check endpoint for deployment monitoring"""
     return JsonResponse({'status': 'ok', 'message': 'Expense Tracker API is running'})
 
 urlpatterns = [
     path('', health_check, name='health_check'),
+    path('ready', readiness_view, name='readiness'),
+    path('metrics', metrics_view, name='metrics'),
     path('api/', include('expenses.urls')),
 ]
@@ -4,8 +4,17 @@ WSGI config for expense_tracker project.
 
 import os
 
+from django.conf import settings
 from django.core.wsgi import get_wsgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'expense_tracker.settings')
 
 application = get_wsgi_application()
+
+# Servers load the application in each worker before it accepts requests.
+# With gunicorn --preload, call warm_up() from a post_fork hook instead so
+# workers do not inherit the master's database connection.
+if settings.WARMUP_ON_BOOT:
+    from .readiness import warm_up
+
+    warm_up()
@@ -3,6 +3,7 @@ Admin configuration for the expenses app.
 """
 from django.contrib import admin
 from .models import Expense
+from .search import search_expenses
 
 
 @admin.register(Expense)
@@ -20,3 +21,9 @@ class ExpenseAdmin(admin.ModelAdmin):
             'classes': ('collapse',)
         }),
     )
+    
+    def get_search_results(self, request, queryset, search_term):
+        """Search through the full-text index instead of icontains scans."""
+        if not search_term.strip():
+            return queryset, False
+        return search_expenses(queryset, search_term), False
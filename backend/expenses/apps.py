@@ -2,8 +2,24 @@
 Apps configuration for the expenses app.
 """
 from django.apps import AppConfig
+from django.db import connections
+from django.db.models.signals import post_migrate
+
+
+def ensure_search_index(sender, using, **kwargs):
+    """Recreate the full-text index if a migration dropped it."""
+    from .models import Expense
+    from .search import install_search_index
+    connection = connections[using]
+    if Expense._meta.db_table in connection.introspection.table_names():
+        install_search_index(connection)
 
 
 class ExpensesConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'expenses'
+    
+    def ready(self):
+        from .checks import warn_on_startup
+        post_migrate.connect(ensure_search_index, sender=self)
+        warn_on_startup()
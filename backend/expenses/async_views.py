@@ -0,0 +1,130 @@
+"""
+Async views for the expenses app.
+
+Native async counterparts of the hot ExpenseViewSet endpoints, for
+deployments served by an ASGI server (e.g. uvicorn). Reads use Django's
+async ORM so a worker can keep many slow clients in flight; writes reuse
+the synchronous idempotent save path, which needs a transaction.
+"""
+import json
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db.models import Count, Sum
+from django.http import HttpResponseNotAllowed, JsonResponse
+from rest_framework.exceptions import ValidationError
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+from .idempotency import recent_responses
+from .models import Expense
+from .serializers import ExpenseSerializer
+from .views import filter_expenses, filter_rollups, format_amount, save_idempotent
+
+JSON_PARAMS = {'ensure_ascii': False}
+
+
+def _json(data, status=200, headers=None):
+    return JsonResponse(data, status=status, headers=headers, safe=False, json_dumps_params=JSON_PARAMS)
+
+
+async def _list(request):
+    """Page-number paginated list, same shape as the DRF endpoint."""
+    page_size = settings.REST_FRAMEWORK['PAGE_SIZE']
+    try:
+        page = int(request.GET.get('page', 1))
+    except ValueError:
+        page = 0
+    try:
+        queryset = filter_expenses(request.GET)
+    except ValidationError as exc:
+        return _json(exc.detail, status=400)
+    count = await queryset.acount()
+    last_page = max((count + page_size - 1) // page_size, 1)
+    if page < 1 or page > last_page:
+        return _json({'detail': 'Invalid page.'}, status=404)
+
+    offset = (page - 1) * page_size
+    rows = [expense async for expense in queryset[offset:offset + page_size]]
+    url = request.build_absolute_uri()
+    previous = None
+    if page > 1:
+        previous = remove_query_param(url, 'page') if page == 2 else replace_query_param(url, 'page', page - 1)
+    return _json({
+        'count': count,
+        'next': replace_query_param(url, 'page', page + 1) if page < last_page else None,
+        'previous': previous,
+        'results': ExpenseSerializer(rows, many=True).data,
+    })
+
+
+async def _create(request):
+    """Create an expense, honouring the Idempotency-Key header."""
+    idempotency_key = request.headers.get('Idempotency-Key')
+    if idempotency_key:
+        replay = await sync_to_async(recent_responses.get)(idempotency_key)
+        if replay is not None:
+            return _json(replay, headers={'X-Idempotency': 'True'})
+
+    try:
+        payload = json.loads(request.body or b'{}') if request.content_type == 'application/json' else request.POST
+    except ValueError as exc:
+        return _json({'detail': f'JSON parse error - {exc}'}, status=400)
+    serializer = ExpenseSerializer(data=payload)
+    if not serializer.is_valid():
+        return _json(serializer.errors, status=400)
+
+    if not idempotency_key:
+        await sync_to_async(serializer.save)()
+        return _json(serializer.data, status=201)
+    data, created = await sync_to_async(save_idempotent)(serializer, idempotency_key)
+    return _json(
+        data,
+        status=201 if created else 200,
+        headers={'X-Idempotency': 'False' if created else 'True'}
+    )
+
+
+# Django 4.2's csrf_exempt/require_http_methods wrap views in sync
+# functions, which would hide these coroutines from the ASGI handler, so
+# the equivalent checks are done inline.
+
+async def expense_list(request):
+    if request.method == 'POST':
+        return await _create(request)
+    if request.method not in ('GET', 'HEAD'):
+        return HttpResponseNotAllowed(['GET', 'HEAD', 'POST'])
+    return await _list(request)
+
+
+expense_list.csrf_exempt = True
+
+
+async def expense_total(request):
+    """Total and count of the filtered view, from the rollup when possible."""
+    if request.method not in ('GET', 'HEAD'):
+        return HttpResponseNotAllowed(['GET', 'HEAD'])
+    try:
+        rollups = filter_rollups(request.GET)
+        queryset = filter_expenses(request.GET)
+    except ValidationError as exc:
+        return _json(exc.detail, status=400)
+    if rollups is not None:
+        totals = await rollups.aaggregate(total=Sum('total'), count=Sum('count'))
+    else:
+        totals = await queryset.order_by().aaggregate(
+            total=Sum('amount'), count=Count('id')
+        )
+    return _json({
+        'total': format_amount(totals['total']),
+        'currency': '₹',
+        'count': totals['count'] or 0,
+    })
+
+
+async def expense_categories(request):
+    if request.method not in ('GET', 'HEAD'):
+        return HttpResponseNotAllowed(['GET', 'HEAD'])
+    return _json([
+        {'value': value, 'label': label}
+        for value, label in Expense.CATEGORY_CHOICES
+    ])
@@ -0,0 +1,66 @@
+"""
+Shared helpers for the benchmark management commands.
+"""
+import json
+import subprocess
+import time
+
+from django.conf import settings
+
+
+def percentile(samples, pct):
+    """Linear-interpolated percentile of an already sorted list."""
+    if not samples:
+        return 0.0
+    rank = (len(samples) - 1) * pct / 100
+    low = int(rank)
+    high = min(low + 1, len(samples) - 1)
+    return samples[low] + (samples[high] - samples[low]) * (rank - low)
+
+
+def summarize(latencies, queries, elapsed, errors=0):
+    """Latency percentiles (ms), throughput and mean queries per request."""
+    latencies = sorted(latencies)
+    return {
+        'iterations': len(latencies),
+        'p50_ms': round(percentile(latencies, 50) * 1000, 3),
+        'p95_ms': round(percentile(latencies, 95) * 1000, 3),
+        'p99_ms': round(percentile(latencies, 99) * 1000, 3),
+        'mean_ms': round(sum(latencies) / len(latencies) * 1000, 3) if latencies else 0.0,
+        'throughput_rps': round(len(latencies) / elapsed, 2) if elapsed else 0.0,
+        'queries_per_request': round(sum(queries) / len(queries), 2) if queries else None,
+        'errors': errors,
+    }
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            capture_output=True, text=True, check=True, cwd=settings.BASE_DIR
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def add_output_argument(parser):
+    parser.add_argument('--output', help='Write the JSON report to this file instead of stdout.')
+
+
+def report_meta(**extra):
+    """Revision and UTC timestamp, followed by the command's own settings."""
+    return {
+        'revision': git_revision(),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+        **extra,
+    }
+
+
+def write_report(command, report, path=None):
+    """Write the report as indented JSON to path, or to the command's stdout."""
+    output = json.dumps(report, indent=2)
+    if path:
+        with open(path, 'w') as handle:
+            handle.write(output + '\n')
+    else:
+        command.stdout.write(output)
@@ -0,0 +1,133 @@
+"""
+Response cache for the read-only expense endpoints.
+
+Cached entries are keyed on a generation value plus the normalized
+request, so any committed write invalidates everything at once by
+replacing the generation; stale entries simply age out of the backend.
+The backend must be shared by every worker process (see checks.py).
+"""
+import secrets
+import threading
+from functools import wraps
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.db import connection, transaction
+from django.utils.cache import get_conditional_response
+from rest_framework.response import Response
+
+GENERATION_KEY = 'expenses:generation'
+DELETE_GENERATION_KEY = 'expenses:delete-generation'
+CACHED_HEADERS = ('ETag',)
+
+_stats = {'hits': 0, 'misses': 0, 'invalidations': 0}
+_stats_lock = threading.Lock()
+
+
+def _count(name):
+    with _stats_lock:
+        _stats[name] += 1
+
+
+def get_cache():
+    return caches[settings.EXPENSES_CACHE_ALIAS]
+
+
+def cache_stats():
+    """Return this process's hit/miss/invalidation counters."""
+    with _stats_lock:
+        stats = dict(_stats)
+    lookups = stats['hits'] + stats['misses']
+    stats['hit_ratio'] = round(stats['hits'] / lookups, 4) if lookups else 0.0
+    return stats
+
+
+def _new_generation():
+    # Random rather than counted: a generation that was evicted or lost in a
+    # restart never repeats a value earlier entries and ETags were keyed on
+    return secrets.randbits(48)
+
+
+def generation_is_shared():
+    """False when generations live in per-process memory, unseen by other workers."""
+    return not isinstance(get_cache(), LocMemCache)
+
+
+def get_generation(key=GENERATION_KEY):
+    cache = get_cache()
+    generation = cache.get(key)
+    if generation is None:
+        generation = _new_generation()
+        cache.add(key, generation, timeout=None)
+        generation = cache.get(key, generation)
+    return generation
+
+
+def bump_generation(key=GENERATION_KEY):
+    """
+    Invalidate every entry keyed on the given generation. A fresh value is
+    set instead of incrementing: the file cache's incr() is a read-modify-
+    write, so two workers bumping at once could both store g+1, and entries
+    cached between the two bumps would survive the second write.
+    """
+    get_cache().set(key, _new_generation(), timeout=None)
+    if key == GENERATION_KEY:
+        _count('invalidations')
+
+
+def invalidate_on_commit(using=None, deletes=False):
+    """
+    Bump the generation once the current transaction commits.
+    Deletes also bump DELETE_GENERATION_KEY, which guards the idempotency
+    replay cache against serving expenses that no longer exist.
+    """
+    transaction.on_commit(bump_generation, using=using)
+    if deletes:
+        transaction.on_commit(lambda: bump_generation(DELETE_GENERATION_KEY), using=using)
+
+
+def build_key(request, name):
+    """Key on generation, endpoint, host, sorted query params and media type."""
+    query = urlencode(sorted(request.query_params.lists()), doseq=True)
+    return ':'.join([
+        'expenses',
+        str(get_generation()),
+        name,
+        request.get_host(),
+        query,
+        getattr(request, 'accepted_media_type', '') or '',
+    ])
+
+
+def cached_response(view_method):
+    """
+    Serve a viewset read action from the cache, storing successful responses.
+    Requests inside a transaction bypass the cache, since they may see
+    uncommitted data.
+    """
+    @wraps(view_method)
+    def wrapper(self, request, *args, **kwargs):
+        if not settings.EXPENSES_CACHE_ENABLED or connection.in_atomic_block:
+            return view_method(self, request, *args, **kwargs)
+
+        cache = get_cache()
+        key = build_key(request, view_method.__name__)
+        entry = cache.get(key)
+        if entry is not None:
+            _count('hits')
+            data, headers = entry
+            response = Response(data, headers=headers)
+            response['X-Cache'] = 'HIT'
+            return get_conditional_response(request, etag=headers.get('ETag'), response=response)
+
+        _count('misses')
+        response = view_method(self, request, *args, **kwargs)
+        if isinstance(response, Response) and response.status_code == 200:
+            headers = {name: response[name] for name in CACHED_HEADERS if name in response}
+            cache.set(key, (response.data, headers), settings.EXPENSES_CACHE_TIMEOUT)
+            response['X-Cache'] = 'MISS'
+        return response
+
+    return wrapper
@@ -0,0 +1,142 @@
+"""
+Delta-sync feed of expenses changed since a watermark.
+
+Live rows are read in (updated_at, id) order through expenses_updated_idx
+and deletions in (deleted_at, expense_id) order through the tombstone
+index; the two streams are merged into one ordered page. The watermark
+returned with each page is the position of its last entry, and with the
+final page the settle cutoff below, so even an empty snapshot gives a
+client a watermark to continue from.
+
+``updated_at`` and ``deleted_at`` are stamped when a row is written, not
+when its transaction commits, so a slow transaction can commit a change
+dated before a watermark a client has already been given. Changes younger
+than EXPENSES_CHANGES_SETTLE_SECONDS are therefore held back until the
+next sync: the feed runs that far behind, and a watermark never passes a
+change that might still be uncommitted.
+"""
+import heapq
+from datetime import timedelta, timezone as dt_timezone
+from itertools import islice
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import ValidationError
+
+from .export import get_converters, serialize_rows
+from .models import Expense, ExpenseTombstone
+from .pagination import KeysetPagination
+from .serializers import ExpenseChangeSerializer
+
+CHANGE_FIELDS = ExpenseChangeSerializer.Meta.fields
+
+
+def encode_watermark(moment, expense_id):
+    """Opaque watermark for the position (moment, expense_id)."""
+    return KeysetPagination.make_token([moment, expense_id])
+
+
+def decode_watermark(value):
+    """
+    Return the (datetime, id) position of a watermark. Besides tokens from
+    earlier responses, a bare ISO-8601 timestamp is accepted and means
+    "everything changed after this moment".
+    """
+    try:
+        moment = parse_datetime(value)
+        if moment is not None:
+            position = [moment, None]
+        else:
+            position, _ = KeysetPagination.read_token(value)
+            position = [parse_datetime(position[0]), int(position[1])]
+    except (ValueError, TypeError, IndexError):
+        raise ValidationError({'since': ['Invalid watermark.']})
+    if position[0] is None:
+        raise ValidationError({'since': ['Invalid watermark.']})
+    if timezone.is_naive(position[0]):
+        position[0] = timezone.make_aware(position[0], dt_timezone.utc)
+    return tuple(position)
+
+
+def is_expired(position):
+    """
+    True if tombstones after ``position`` have been pruned, so the client
+    may have missed deletions. The age of the watermark does not matter:
+    a client of an idle ledger stays valid as long as nothing it needs
+    was pruned.
+    """
+    horizon = ExpenseTombstone.objects.horizon()
+    if horizon is None:
+        return False
+    moment, expense_id = position
+    # A bare timestamp (no id) is past every change at that moment
+    return moment < horizon[0] or (moment == horizon[0] and expense_id is not None and expense_id < horizon[1])
+
+
+def _after(time_field, id_field, position):
+    """
+    Rows strictly after ``position`` in (time_field, id_field) order. The
+    redundant leading ``>=`` gives SQLite a range to seek instead of
+    scanning the whole index for the OR.
+    """
+    moment, expense_id = position
+    if expense_id is None:
+        return Q(**{f'{time_field}__gt': moment})
+    return Q(**{f'{time_field}__gte': moment}) & (
+        Q(**{f'{time_field}__gt': moment}) | Q(**{f'{id_field}__gt': expense_id})
+    )
+
+
+def changes_since(position, limit):
+    """
+    Up to ``limit`` settled changes after ``position`` (None for a full
+    snapshot, which needs no tombstones). Returns ``(entries, has_more, end)``
+    where each entry is ``(moment, expense_id, row)``; ``row`` holds the
+    values of CHANGE_FIELDS for live expenses and is None for deletions.
+    ``end`` is the position to resume from: the last entry while more
+    follow, otherwise the settle cutoff, since every settled change up to
+    it has then been returned.
+    """
+    settled = timezone.now() - timedelta(seconds=settings.EXPENSES_CHANGES_SETTLE_SECONDS)
+    expenses = Expense.objects.order_by('updated_at', 'id').filter(updated_at__lte=settled)
+    if position is None:
+        tombstones = ExpenseTombstone.objects.none()
+    else:
+        expenses = expenses.filter(_after('updated_at', 'id', position))
+        tombstones = ExpenseTombstone.objects.order_by('deleted_at', 'expense_id').filter(
+            _after('deleted_at', 'expense_id', position), deleted_at__lte=settled
+        )
+    moment_index, id_index = CHANGE_FIELDS.index('updated_at'), CHANGE_FIELDS.index('id')
+    live = (
+        (row[moment_index], row[id_index], row)
+        for row in expenses.values_list(*CHANGE_FIELDS)[:limit + 1]
+    )
+    deleted = (
+        (deleted_at, expense_id, None)
+        for deleted_at, expense_id in tombstones.values_list('deleted_at', 'expense_id')[:limit + 1]
+    )
+    entries = list(islice(heapq.merge(live, deleted, key=lambda entry: entry[:2]), limit + 1))
+    if len(entries) > limit:
+        return entries[:limit], True, entries[limit - 1][:2]
+    # Ids start at 1, so (settled, 0) sorts before any change at that moment
+    end = max([(settled, 0), *(entry[:2] for entry in entries[-1:])])
+    if position is not None and end[0] < position[0]:
+        # A bare timestamp from the future; 0 instead of None keeps it a token
+        end = (position[0], position[1] or 0)
+    return entries, False, end
+
+
+def serialize_changes(entries):
+    """
+    ExpenseChangeSerializer dicts for live rows and
+    ``{"id", "deleted", "updated_at"}`` for deletions.
+    """
+    converters = get_converters(ExpenseChangeSerializer(), CHANGE_FIELDS)
+    format_moment = converters[CHANGE_FIELDS.index('updated_at')]
+    return [
+        serialize_rows([row], CHANGE_FIELDS, converters)[0] if row is not None
+        else {'id': expense_id, 'deleted': True, 'updated_at': format_moment(moment)}
+        for moment, expense_id, row in entries
+    ]
@@ -0,0 +1,66 @@
+"""
+System checks for the expenses app.
+"""
+import logging
+import os
+import shlex
+import sys
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.checks import Tags, Warning, register
+
+logger = logging.getLogger('expenses')
+
+
+def configured_workers():
+    """
+    Worker processes the server runs: gunicorn's -w/--workers (from the
+    command line or GUNICORN_CMD_ARGS), else WEB_CONCURRENCY, else 1.
+    """
+    args = shlex.split(os.environ.get('GUNICORN_CMD_ARGS', ''))
+    if 'gunicorn' in os.path.basename(sys.argv[0]):
+        args += sys.argv[1:]
+    workers = os.environ.get('WEB_CONCURRENCY')
+    for index, arg in enumerate(args):
+        if arg in ('-w', '--workers') and index + 1 < len(args):
+            workers = args[index + 1]
+        elif arg.startswith('--workers='):
+            workers = arg.partition('=')[2]
+        elif arg.startswith('-w') and arg[2:].isdigit():
+            workers = arg[2:]
+    try:
+        return int(workers or 1)
+    except ValueError:
+        return 1
+
+
+@register(Tags.caches)
+def check_response_cache_is_shared(app_configs=None, **kwargs):
+    """
+    A per-process cache only sees the writes its own worker made, so the
+    other workers would keep serving stale responses and 304s.
+    """
+    if not settings.EXPENSES_CACHE_ENABLED:
+        return []
+    workers = configured_workers()
+    if workers > 1 and isinstance(caches[settings.EXPENSES_CACHE_ALIAS], LocMemCache):
+        return [Warning(
+            f'The expenses response cache is per process, but {workers} worker processes are configured; '
+            'writes only invalidate the cache of the worker that handled them.',
+            hint='Set CACHE_BACKEND=file (one host) or CACHE_BACKEND=redis, or EXPENSES_CACHE_ENABLED=False.',
+            id='expenses.W001',
+        )]
+    return []
+
+
+def warn_on_startup():
+    """
+    Log check_response_cache_is_shared() warnings when a server loads the
+    app: gunicorn and uvicorn do not run system checks, manage.py does.
+    """
+    if os.path.basename(sys.argv[0]) == 'manage.py':
+        return
+    for warning in check_response_cache_is_shared():
+        logger.warning('%s (%s) HINT: %s', warning.msg, warning.id, warning.hint)
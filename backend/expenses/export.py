@@ -0,0 +1,156 @@
+"""
+Row formatting helpers for the fast list path and the streaming export.
+"""
+import csv
+import json
+from datetime import date
+from decimal import Decimal, getcontext
+from itertools import islice
+
+from asgiref.sync import sync_to_async
+from rest_framework import ISO_8601, serializers
+from rest_framework.settings import api_settings
+
+
+class _Echo:
+    """File-like object whose write() returns the value instead of buffering it."""
+
+    def write(self, value):
+        return value
+
+
+def _datetime_converter(field):
+    """ISO 8601 DateTimeField output with the field's timezone resolved once."""
+    output_format = getattr(field, 'format', api_settings.DATETIME_FORMAT)
+    field_timezone = field.timezone if hasattr(field, 'timezone') else field.default_timezone()
+    if output_format is None or output_format.lower() != ISO_8601 or field_timezone is None:
+        return None
+    fallback = field.to_representation
+
+    def convert(value):
+        if isinstance(value, str) or value.tzinfo is None:
+            return fallback(value)
+        value = value.astimezone(field_timezone).isoformat()
+        return value[:-6] + 'Z' if value.endswith('+00:00') else value
+    return convert
+
+
+def _date_converter(field):
+    output_format = getattr(field, 'format', api_settings.DATE_FORMAT)
+    if output_format is None or output_format.lower() != ISO_8601:
+        return None
+    fallback = field.to_representation
+
+    def convert(value):
+        return value.isoformat() if type(value) is date else fallback(value)
+    return convert
+
+
+def _decimal_converter(field):
+    """DecimalField string output with the quantum and context built once."""
+    coerce_to_string = getattr(field, 'coerce_to_string', api_settings.COERCE_DECIMAL_TO_STRING)
+    if not coerce_to_string or field.localize or field.decimal_places is None:
+        return None
+    quantum = Decimal('.1') ** field.decimal_places
+    context = getcontext().copy()
+    if field.max_digits is not None:
+        context.prec = field.max_digits
+    rounding = field.rounding
+    fallback = field.to_representation
+
+    def convert(value):
+        if type(value) is not Decimal:
+            return fallback(value)
+        return '{:f}'.format(value.quantize(quantum, rounding=rounding, context=context))
+    return convert
+
+
+def _choice_converter(field):
+    choices = field.choice_strings_to_values
+
+    def convert(value):
+        return value if value == '' else choices.get(str(value), value)
+    return convert
+
+
+# Matched on exact type: subclasses may override to_representation
+CONVERTER_FACTORIES = [
+    (serializers.DateTimeField, _datetime_converter),
+    (serializers.DateField, _date_converter),
+    (serializers.DecimalField, _decimal_converter),
+    (serializers.ChoiceField, _choice_converter),
+]
+
+
+def get_converters(serializer, fields):
+    """
+    Return one converter per field that formats a raw column value exactly
+    like the field's to_representation. Common field types get a
+    specialized converter with per-call settings lookups hoisted out;
+    everything else uses to_representation itself.
+    """
+    converters = []
+    for name in fields:
+        field = serializer.fields[name]
+        convert = None
+        for field_class, factory in CONVERTER_FACTORIES:
+            if type(field) is field_class:
+                convert = factory(field)
+                break
+        converters.append(convert or field.to_representation)
+    return converters
+
+
+def serialize_rows(rows, fields, converters):
+    """Format row tuples as the dicts ExpenseSerializer(many=True) would return."""
+    return [
+        {
+            name: convert(value) if value is not None else None
+            for name, convert, value in zip(fields, converters, row)
+        }
+        for row in rows
+    ]
+
+
+def iter_csv(rows, fields, converters):
+    """Yield a CSV header line and then one line per row tuple."""
+    writer = csv.writer(_Echo())
+    yield writer.writerow(fields)
+    for row in rows:
+        yield writer.writerow([
+            convert(value) if value is not None else ''
+            for convert, value in zip(converters, row)
+        ])
+
+
+def iter_ndjson(rows, fields, converters):
+    """Yield one JSON object per line for each row tuple."""
+    dumps = json.JSONEncoder(ensure_ascii=False, separators=(',', ':')).encode
+    for row in rows:
+        yield dumps({
+            name: convert(value) if value is not None else None
+            for name, convert, value in zip(fields, converters, row)
+        }) + '\n'
+
+
+async def iterate_async(iterable, batch_size):
+    """
+    Async iterator over ``iterable``, advanced ``batch_size`` items at a
+    time on the thread that ran the sync view and owns its database
+    cursor. Under ASGI, Django collects a sync streaming iterator into a
+    list before sending it, which would hold the whole export in memory.
+    """
+    iterator = iter(iterable)
+    next_batch = sync_to_async(lambda: list(islice(iterator, batch_size)), thread_sensitive=True)
+    while True:
+        batch = await next_batch()
+        if not batch:
+            return
+        for item in batch:
+            yield item
+
+
+EXPORT_FORMATS = {
+    'csv': (iter_csv, 'text/csv; charset=utf-8'),
+    'ndjson': (iter_ndjson, 'application/x-ndjson; charset=utf-8'),
+}
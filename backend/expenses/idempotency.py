@@ -0,0 +1,83 @@
+"""
+In-process replay cache for idempotent expense creation.
+"""
+import threading
+from collections import OrderedDict
+
+from django.conf import settings
+from django.db import connection
+
+from .cache import DELETE_GENERATION_KEY, generation_is_shared, get_generation
+from .models import Expense
+
+
+class RecentResponses:
+    """
+    Bounded, thread-safe LRU of idempotency key -> serialized expense.
+
+    Retries of a recently seen key are answered from memory without a
+    database query. Entries remember the delete generation they were stored
+    under and are ignored once any expense has been deleted since, so a key
+    can be reused after its expense is removed. The generation lives in the
+    shared cache; with a per-process cache a delete made by another worker
+    would go unseen, so there each replay first checks that the expense
+    still exists. Like the response cache, it is bypassed inside an outer
+    transaction, whose writes may roll back.
+    """
+
+    def __init__(self, maxsize=None):
+        self._maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def maxsize(self):
+        if self._maxsize is not None:
+            return self._maxsize
+        return settings.EXPENSES_IDEMPOTENCY_CACHE_SIZE
+
+    def _enabled(self):
+        return self.maxsize > 0 and not connection.in_atomic_block
+
+    def get(self, key):
+        if not self._enabled():
+            return None
+        generation = get_generation(DELETE_GENERATION_KEY)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] != generation:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            data = entry[1]
+        if not generation_is_shared() and not Expense.objects.filter(pk=data['id']).exists():
+            self.discard(key)
+            return None
+        return data
+
+    def put(self, key, data):
+        if not self._enabled():
+            return
+        maxsize = self.maxsize
+        generation = get_generation(DELETE_GENERATION_KEY)
+        with self._lock:
+            self._entries[key] = (generation, data)
+            self._entries.move_to_end(key)
+            while len(self._entries) > maxsize:
+                self._entries.popitem(last=False)
+
+    def discard(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+recent_responses = RecentResponses()
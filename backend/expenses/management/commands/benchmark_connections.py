@@ -0,0 +1,115 @@
+"""
+Measure per-request latency with and without persistent database connections.
+Usage:
+    python manage.py benchmark_connections --iterations 500 --output conn.json
+
+Requests go through the real WSGI handler, so connections are opened and
+closed by Django's request_finished handling exactly as under gunicorn.
+Each mode sets CONN_MAX_AGE/CONN_HEALTH_CHECKS on the default connection
+and reports latency percentiles plus how many connections were opened per
+request. The gap is largest on PostgreSQL over a network, where every new
+connection pays a TCP/TLS handshake and authentication.
+"""
+import platform
+import time
+from wsgiref.util import setup_testing_defaults
+
+import django
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.backends.signals import connection_created
+from django.test import override_settings
+
+from expenses.benchmarking import add_output_argument, report_meta, summarize, write_report
+
+DEFAULT_PATHS = ['/api/expenses/categories/', '/api/expenses/total/', '/api/expenses/']
+
+
+class Command(BaseCommand):
+    help = 'Compare request latency with per-request and persistent DB connections.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=200, help='Requests per path and mode.')
+        parser.add_argument('--warmup', type=int, default=5, help='Unmeasured requests per path and mode.')
+        parser.add_argument('--path', action='append', help=f'Path to request (default: {", ".join(DEFAULT_PATHS)}).')
+        parser.add_argument('--max-age', type=int, default=600, help='CONN_MAX_AGE for the persistent modes.')
+        parser.add_argument('--with-cache', action='store_true', help='Leave the response cache enabled.')
+        add_output_argument(parser)
+
+    def handle(self, *args, **options):
+        if connection.in_atomic_block:
+            raise CommandError('Cannot benchmark connection handling inside a transaction.')
+
+        modes = {
+            'per_request': {'CONN_MAX_AGE': 0, 'CONN_HEALTH_CHECKS': False},
+            'persistent': {'CONN_MAX_AGE': options['max_age'], 'CONN_HEALTH_CHECKS': False},
+            'persistent_health_checks': {'CONN_MAX_AGE': options['max_age'], 'CONN_HEALTH_CHECKS': True},
+        }
+        self.handler = WSGIHandler()
+        self.opened = 0
+        connection_created.connect(self.count_connection)
+        original = {name: connection.settings_dict[name] for name in ('CONN_MAX_AGE', 'CONN_HEALTH_CHECKS')}
+        cache_setting = {} if options['with_cache'] else {'EXPENSES_CACHE_ENABLED': False}
+
+        results = {}
+        try:
+            with override_settings(**cache_setting):
+                for mode, conn_settings in modes.items():
+                    # close_at is computed when a connection opens, so start fresh
+                    connection.close()
+                    connection.settings_dict.update(conn_settings)
+                    results[mode] = {}
+                    for path in options['path'] or DEFAULT_PATHS:
+                        results[mode][path] = self.run_path(path, options['iterations'], options['warmup'])
+                        self.stderr.write(
+                            f'{mode} {path}: p50={results[mode][path]["p50_ms"]}ms '
+                            f'connections/request={results[mode][path]["connections_per_request"]}'
+                        )
+        finally:
+            connection_created.disconnect(self.count_connection)
+            connection.close()
+            connection.settings_dict.update(original)
+
+        report = {
+            'meta': report_meta(
+                database=connection.vendor,
+                python=platform.python_version(),
+                django=django.get_version(),
+                cache=bool(options['with_cache']),
+            ),
+            'modes': results,
+        }
+        write_report(self, report, options['output'])
+
+    def count_connection(self, sender, connection, **kwargs):
+        self.opened += 1
+
+    def request(self, path):
+        """Run one GET through the WSGI handler, including request_finished."""
+        environ = {'PATH_INFO': path, 'HTTP_HOST': 'localhost'}
+        setup_testing_defaults(environ)
+        statuses = []
+        body = self.handler(environ, lambda status, headers, exc_info=None: statuses.append(status))
+        try:
+            for _ in body:
+                pass
+        finally:
+            body.close()
+        return int(statuses[0].split()[0])
+
+    def run_path(self, path, iterations, warmup):
+        for _ in range(warmup):
+            self.request(path)
+        self.opened = 0
+        latencies = []
+        started = time.perf_counter()
+        for _ in range(iterations):
+            begin = time.perf_counter()
+            status = self.request(path)
+            latencies.append(time.perf_counter() - begin)
+            if status >= 400:
+                raise CommandError(f'{path} failed with HTTP {status}')
+        result = summarize(latencies, [], time.perf_counter() - started)
+        result['connections_per_request'] = round(self.opened / iterations, 3) if iterations else 0.0
+        return result
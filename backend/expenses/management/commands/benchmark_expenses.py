@@ -0,0 +1,132 @@
+"""
+Benchmark the expenses API in-process against the configured database.
+Usage:
+    python manage.py seed_expenses --count 100000
+    python manage.py benchmark_expenses --iterations 200 --output bench.json
+
+Each scenario issues real requests through the full Django/DRF stack and
+reports p50/p95/p99 latency, throughput and queries per request as JSON,
+so runs can be diffed across commits and database backends.
+"""
+import platform
+import time
+import uuid
+
+import django
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from expenses.benchmarking import add_output_argument, report_meta, summarize, write_report
+from expenses.models import Expense
+from expenses.pagination import KeysetPagination
+
+BENCH_PREFIX = 'bench-'
+
+
+class Command(BaseCommand):
+    help = 'Run latency/throughput scenarios against the expenses API and report JSON.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=100, help='Requests per scenario.')
+        parser.add_argument('--warmup', type=int, default=5, help='Unmeasured requests per scenario.')
+        parser.add_argument('--scenario', action='append', help='Only run the named scenario(s).')
+        parser.add_argument('--with-cache', action='store_true', help='Leave the response cache enabled.')
+        parser.add_argument('--keep-rows', action='store_true', help='Keep expenses created by write scenarios.')
+        add_output_argument(parser)
+
+    def handle(self, *args, **options):
+        rows = Expense.objects.count()
+        if not rows:
+            raise CommandError('No expenses found; run seed_expenses first.')
+
+        self.client = Client(HTTP_HOST='localhost')
+        self.run_id = uuid.uuid4().hex[:8]
+        scenarios = self.get_scenarios(rows)
+        selected = options['scenario'] or list(scenarios)
+        unknown = set(selected) - set(scenarios)
+        if unknown:
+            raise CommandError(f'Unknown scenario(s): {", ".join(sorted(unknown))}')
+
+        results = {}
+        cache_setting = {} if options['with_cache'] else {'EXPENSES_CACHE_ENABLED': False}
+        try:
+            with override_settings(**cache_setting):
+                for name in selected:
+                    results[name] = self.run_scenario(
+                        scenarios[name], options['iterations'], options['warmup']
+                    )
+                    self.stderr.write(f'{name}: p50={results[name]["p50_ms"]}ms p99={results[name]["p99_ms"]}ms')
+        finally:
+            if not options['keep_rows']:
+                Expense.objects.filter(description__startswith=BENCH_PREFIX).delete()
+
+        report = {
+            'meta': report_meta(
+                database=connection.vendor,
+                rows=rows,
+                python=platform.python_version(),
+                django=django.get_version(),
+                cache=bool(options['with_cache']),
+            ),
+            'scenarios': results,
+        }
+        write_report(self, report, options['output'])
+
+    def get_scenarios(self, rows):
+        """Map scenario names to zero-argument callables returning a response."""
+        page_size = settings.REST_FRAMEWORK['PAGE_SIZE']
+        deep_offset = max(rows - page_size, 0) // 2
+        deep_page = deep_offset // page_size + 1
+        deep_row = (
+            Expense.objects.order_by('-date', '-created_at', '-id')
+            .values_list('date', 'created_at', 'id')[deep_offset]
+        )
+        deep_cursor = KeysetPagination.make_token(deep_row)
+        counter = iter(range(10 ** 12))
+
+        def post(key=None):
+            headers = {'HTTP_IDEMPOTENCY_KEY': key} if key else {}
+            return self.client.post('/api/expenses/', {
+                'amount': '42.00',
+                'category': 'other',
+                'description': f'{BENCH_PREFIX}{self.run_id}',
+                'date': '2024-01-01',
+            }, content_type='application/json', **headers)
+
+        def export():
+            response = self.client.get('/api/expenses/export/?output=ndjson')
+            for _ in response.streaming_content:
+                pass
+            return response
+
+        return {
+            'list_first_page': lambda: self.client.get('/api/expenses/'),
+            'list_deep_page': lambda: self.client.get(f'/api/expenses/?page={deep_page}'),
+            'list_deep_cursor': lambda: self.client.get(f'/api/expenses/?cursor={deep_cursor}'),
+            'list_filtered': lambda: self.client.get('/api/expenses/?category=food&sort=date_asc'),
+            'total': lambda: self.client.get('/api/expenses/total/'),
+            'total_filtered': lambda: self.client.get('/api/expenses/total/?category=food'),
+            'summary': lambda: self.client.get('/api/expenses/summary/'),
+            'create': lambda: post(),
+            'create_idempotent': lambda: post(f'{BENCH_PREFIX}{self.run_id}-{next(counter)}'),
+            'create_replay': lambda: post(f'{BENCH_PREFIX}{self.run_id}-replay'),
+            'export': export,
+        }
+
+    def run_scenario(self, request, iterations, warmup):
+        for _ in range(warmup):
+            request()
+        latencies, queries = [], []
+        started = time.perf_counter()
+        for _ in range(iterations):
+            with CaptureQueriesContext(connection) as captured:
+                begin = time.perf_counter()
+                response = request()
+                latencies.append(time.perf_counter() - begin)
+            if response.status_code >= 400:
+                raise CommandError(f'Request failed with HTTP {response.status_code}')
+            queries.append(len(captured))
+        return summarize(latencies, queries, time.perf_counter() - started)
@@ -0,0 +1,85 @@
+"""
+Compare list endpoint latency with the serializer and the fast rendering path.
+Usage:
+    python manage.py seed_expenses --count 100000
+    python manage.py benchmark_list_rendering --iterations 20 --output list.json
+
+For each page size, the first page is requested with EXPENSES_FAST_LIST
+off and on (response cache disabled). The report gives latency percentiles
+per mode, the speedup at p50, and whether both modes returned
+byte-identical bodies.
+"""
+import platform
+import time
+
+import django
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client, override_settings
+
+from expenses.benchmarking import add_output_argument, report_meta, summarize, write_report
+from expenses.models import Expense
+from expenses.renderers import orjson
+
+DEFAULT_PAGE_SIZES = [100, 1000, 10000]
+
+
+class Command(BaseCommand):
+    help = 'Benchmark list rendering through the serializer vs the fast path and report JSON.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=20, help='Requests per page size and mode.')
+        parser.add_argument('--warmup', type=int, default=2, help='Unmeasured requests per page size and mode.')
+        parser.add_argument(
+            '--page-size', type=int, action='append',
+            help=f'Page size to test; repeat for several (default: {", ".join(map(str, DEFAULT_PAGE_SIZES))}).'
+        )
+        parser.add_argument('--pagination', choices=['page', 'cursor'], default='page', help='Pagination style.')
+        add_output_argument(parser)
+
+    def handle(self, *args, **options):
+        rows = Expense.objects.count()
+        if not rows:
+            raise CommandError('No expenses found; run seed_expenses first.')
+
+        client = Client(HTTP_HOST='localhost')
+        results = {}
+        for page_size in options['page_size'] or DEFAULT_PAGE_SIZES:
+            path = f'/api/expenses/?page_size={page_size}'
+            if options['pagination'] == 'cursor':
+                path += '&pagination=cursor'
+            result, bodies = {}, {}
+            for mode, fast in (('serializer', False), ('fast', True)):
+                with override_settings(EXPENSES_CACHE_ENABLED=False, EXPENSES_FAST_LIST=fast):
+                    for _ in range(options['warmup']):
+                        client.get(path)
+                    latencies = []
+                    started = time.perf_counter()
+                    for _ in range(options['iterations']):
+                        begin = time.perf_counter()
+                        response = client.get(path)
+                        latencies.append(time.perf_counter() - begin)
+                        if response.status_code >= 400:
+                            raise CommandError(f'{path} failed with HTTP {response.status_code}')
+                    result[mode] = summarize(latencies, [], time.perf_counter() - started)
+                    bodies[mode] = response.content
+            result['speedup_p50'] = round(result['serializer']['p50_ms'] / max(result['fast']['p50_ms'], 1e-9), 2)
+            result['identical'] = bodies['serializer'] == bodies['fast']
+            results[str(page_size)] = result
+            self.stderr.write(
+                f'page_size={page_size}: serializer p50={result["serializer"]["p50_ms"]}ms '
+                f'fast p50={result["fast"]["p50_ms"]}ms identical={result["identical"]}'
+            )
+
+        report = {
+            'meta': report_meta(
+                database=connection.vendor,
+                rows=rows,
+                python=platform.python_version(),
+                django=django.get_version(),
+                orjson=orjson is not None,
+                pagination=options['pagination'],
+            ),
+            'page_sizes': results,
+        }
+        write_report(self, report, options['output'])
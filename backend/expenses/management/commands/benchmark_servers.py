@@ -0,0 +1,85 @@
+"""
+Compare concurrent-request throughput of running API deployments over HTTP.
+Usage (same database, one server per interface):
+    gunicorn expense_tracker.wsgi:application -w 2 -b 127.0.0.1:8001
+    gunicorn expense_tracker.asgi:application -w 2 -k uvicorn.workers.UvicornWorker -b 127.0.0.1:8002
+    python manage.py benchmark_servers \
+        --target wsgi=http://127.0.0.1:8001/api/expenses/total/ \
+        --target asgi=http://127.0.0.1:8002/api/async/expenses/total/ \
+        --concurrency 64 --requests 2000
+
+Every target gets the same number of requests from the same pool of client
+threads; --client-delay makes each client hold its connection open before
+reading the body, to model slow clients.
+"""
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand, CommandError
+
+from expenses.benchmarking import add_output_argument, report_meta, summarize, write_report
+
+
+def timed_get(url, timeout, client_delay):
+    """Return (seconds, ok) for one GET of ``url``."""
+    begin = time.perf_counter()
+    try:
+        with urllib.request.urlopen(url, timeout=timeout) as response:
+            if client_delay:
+                time.sleep(client_delay)
+            response.read()
+            ok = response.status < 400
+    except (urllib.error.URLError, OSError):
+        ok = False
+    return time.perf_counter() - begin, ok
+
+
+class Command(BaseCommand):
+    help = 'Load-test running WSGI/ASGI deployments and compare throughput as JSON.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--target', action='append', required=True,
+            help='NAME=URL to benchmark; repeat for each deployment.'
+        )
+        parser.add_argument('--requests', type=int, default=1000, help='Requests per target.')
+        parser.add_argument('--concurrency', type=int, default=32, help='Concurrent client threads.')
+        parser.add_argument('--warmup', type=int, default=20, help='Unmeasured requests per target.')
+        parser.add_argument('--client-delay', type=float, default=0.0, help='Seconds each client waits before reading.')
+        parser.add_argument('--timeout', type=float, default=30.0, help='Per-request timeout in seconds.')
+        add_output_argument(parser)
+
+    def handle(self, *args, **options):
+        targets = []
+        for target in options['target']:
+            name, sep, url = target.partition('=')
+            if not sep or not url:
+                raise CommandError(f'Expected NAME=URL, got "{target}".')
+            targets.append((name, url))
+
+        results = {}
+        with ThreadPoolExecutor(max_workers=options['concurrency']) as pool:
+            for name, url in targets:
+                fetch = lambda _: timed_get(url, options['timeout'], options['client_delay'])
+                list(pool.map(fetch, range(options['warmup'])))
+                started = time.perf_counter()
+                samples = list(pool.map(fetch, range(options['requests'])))
+                elapsed = time.perf_counter() - started
+                latencies = [seconds for seconds, ok in samples if ok]
+                errors = len(samples) - len(latencies)
+                results[name] = dict(summarize(latencies, [], elapsed, errors), url=url)
+                self.stderr.write(
+                    f'{name}: {results[name]["throughput_rps"]} req/s, '
+                    f'p99={results[name]["p99_ms"]}ms, errors={errors}'
+                )
+
+        report = {
+            'meta': report_meta(
+                concurrency=options['concurrency'],
+                client_delay=options['client_delay'],
+            ),
+            'targets': results,
+        }
+        write_report(self, report, options['output'])
@@ -0,0 +1,29 @@
+"""
+Remove deletion records older than the changes-feed retention window.
+Usage: python manage.py prune_expense_tombstones [--days 30]
+
+Clients whose watermark predates a pruned record get 410 Gone from the
+feed and resync, so a shorter --days is safe; it only forces more resyncs.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from expenses.models import ExpenseTombstone
+
+
+class Command(BaseCommand):
+    help = 'Delete ExpenseTombstone rows older than EXPENSES_TOMBSTONE_RETENTION_DAYS.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days', type=int, default=None,
+            help='Retention in days (default: EXPENSES_TOMBSTONE_RETENTION_DAYS).'
+        )
+
+    def handle(self, *args, **options):
+        days = settings.EXPENSES_TOMBSTONE_RETENTION_DAYS if options['days'] is None else options['days']
+        pruned = ExpenseTombstone.objects.prune(timezone.now() - timedelta(days=days))
+        self.stdout.write(self.style.SUCCESS(f'Pruned {pruned} tombstone(s) older than {days} day(s).'))
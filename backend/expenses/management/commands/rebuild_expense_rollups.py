@@ -0,0 +1,15 @@
+"""
+Rebuild the per-(date, category) expense rollup from the expenses table.
+Usage: python manage.py rebuild_expense_rollups
+"""
+from django.core.management.base import BaseCommand
+
+from expenses.models import ExpenseRollup
+
+
+class Command(BaseCommand):
+    help = 'Recompute the ExpenseRollup table from scratch.'
+
+    def handle(self, *args, **options):
+        buckets = ExpenseRollup.objects.rebuild()
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt {buckets} rollup bucket(s).'))
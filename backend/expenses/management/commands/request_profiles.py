@@ -0,0 +1,83 @@
+"""
+List, inspect and clear request profiles, or mint a profiling token.
+Usage:
+    python manage.py request_profiles token          # value for the X-Profile header
+    python manage.py request_profiles list
+    python manage.py request_profiles show <id> [--sort tottime] [--limit 30]
+    python manage.py request_profiles clear
+"""
+import pstats
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from expense_tracker.profiling import list_profiles, make_token, profile_dir
+
+SORT_KEYS = ('cumulative', 'tottime', 'ncalls', 'filename')
+
+
+class Command(BaseCommand):
+    help = 'Manage per-request profiles written by RequestProfilingMiddleware.'
+
+    def add_arguments(self, parser):
+        actions = parser.add_subparsers(dest='action', required=True)
+        actions.add_parser('token', help='Print a signed X-Profile header value.')
+        actions.add_parser('list', help='List stored profiles, oldest first.')
+        show = actions.add_parser('show', help='Summarize one profile: hot functions and its SQL.')
+        show.add_argument('profile_id', help='Profile id, or a unique prefix, or "latest".')
+        show.add_argument('--sort', choices=SORT_KEYS, default='cumulative', help='pstats sort key.')
+        show.add_argument('--limit', type=int, default=25, help='Functions and queries to show.')
+        actions.add_parser('clear', help='Delete every stored profile.')
+
+    def handle(self, *args, **options):
+        getattr(self, f'handle_{options["action"]}')(**options)
+
+    def handle_token(self, **options):
+        if not settings.PROFILING_ENABLED:
+            self.stderr.write('Warning: PROFILING_ENABLED is off, so the server will ignore this token.')
+        self.stdout.write(make_token())
+
+    def handle_list(self, **options):
+        profiles = list_profiles()
+        if not profiles:
+            self.stdout.write(f'No profiles in {profile_dir()}.')
+            return
+        self.stdout.write(f'{"id":<36} {"time":<20} {"ms":>9} {"queries":>7} {"db ms":>9}  request')
+        for profile in profiles:
+            self.stdout.write(
+                f'{profile["id"]:<36} {profile["timestamp"]:<20} {profile["duration_ms"]:>9.1f} '
+                f'{profile["query_count"]:>7} {profile["db_ms"]:>9.1f}  '
+                f'{profile["method"]} {profile["path"]} -> {profile["status"]} ({profile["trigger"]})'
+            )
+
+    def handle_show(self, profile_id, sort, limit, **options):
+        profiles = list_profiles()
+        if profile_id == 'latest':
+            matches = profiles[-1:]
+        else:
+            matches = [profile for profile in profiles if profile['id'].startswith(profile_id)]
+        if len(matches) != 1:
+            raise CommandError(f'{len(matches)} profiles match "{profile_id}".')
+        profile = matches[0]
+
+        self.stdout.write(
+            f'{profile["method"]} {profile["path"]} ({profile["route"]}) -> {profile["status"]}\n'
+            f'{profile["duration_ms"]:.1f}ms total, {profile["query_count"]} queries, '
+            f'{profile["db_ms"]:.1f}ms in the database ({profile["trigger"]}, {profile["timestamp"]})\n'
+        )
+        if profile.get('note'):
+            self.stdout.write(f'Note: {profile["note"]}\n')
+        stats = pstats.Stats(str(profile_dir() / f'{profile["id"]}.prof'), stream=self.stdout)
+        stats.strip_dirs().sort_stats(sort).print_stats(limit)
+
+        queries = sorted(profile['queries'], key=lambda query: query['ms'], reverse=True)
+        self.stdout.write(f'Slowest queries ({len(queries)} total):')
+        for query in queries[:limit]:
+            self.stdout.write(f'  {query["ms"]:>9.3f}ms  {query["sql"]}')
+
+    def handle_clear(self, **options):
+        removed = 0
+        for path in list(profile_dir().glob('*.json')) + list(profile_dir().glob('*.prof')):
+            path.unlink(missing_ok=True)
+            removed += path.suffix == '.json'
+        self.stdout.write(self.style.SUCCESS(f'Removed {removed} profile(s).'))
@@ -0,0 +1,179 @@
+"""
+Generate synthetic expenses in bulk for load testing and staging refreshes.
+Usage: python manage.py seed_expenses --count 1000000 --seed 42
+
+Rows are written in large batches, one transaction per batch, as
+pre-formatted parameter tuples (executemany on SQLite, multi-row INSERTs
+elsewhere) rather than model instances, since per-field ORM preparation
+dominates load time at this volume. Rollup maintenance is skipped during
+the load and the rollup is rebuilt once at the end; so is the full-text
+search index, whose per-row triggers would otherwise cut load speed by
+two thirds. On SQLite, durability pragmas are relaxed for the duration of
+the load.
+"""
+import random
+import time
+from contextlib import contextmanager
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, models, transaction
+from django.utils import timezone
+
+from expenses.cache import invalidate_on_commit
+from expenses.models import Expense, ExpenseRollup, ExpenseTombstone
+from expenses.search import search_index_suspended
+
+DESCRIPTIONS = {
+    'food': ['Groceries', 'Lunch', 'Dinner out', 'Coffee', 'Snacks'],
+    'transport': ['Taxi', 'Bus pass', 'Fuel', 'Train ticket', 'Parking'],
+    'entertainment': ['Movie tickets', 'Concert', 'Streaming plan', 'Games'],
+    'utilities': ['Electricity bill', 'Water bill', 'Internet', 'Phone recharge'],
+    'shopping': ['Clothes', 'Shoes', 'Electronics', 'Home decor'],
+    'health': ['Pharmacy', 'Doctor visit', 'Gym membership', 'Lab tests'],
+    'other': ['Haircut', 'Gift', 'Donation', 'Stationery'],
+}
+
+# Applied on SQLite while loading, restored afterwards
+LOAD_PRAGMAS = {
+    'synchronous': 'OFF',
+    'journal_mode': 'MEMORY',
+    'temp_store': 'MEMORY',
+    'cache_size': '-262144',  # 256 MiB
+}
+
+
+@contextmanager
+def sqlite_load_pragmas():
+    """
+    Relax SQLite durability settings for a bulk load.
+    Pragmas can't change inside a transaction, so nested loads skip them.
+    """
+    if connection.vendor != 'sqlite' or connection.in_atomic_block:
+        yield
+        return
+    with connection.cursor() as cursor:
+        previous = {}
+        for name, value in LOAD_PRAGMAS.items():
+            current = cursor.execute(f'PRAGMA {name}').fetchone()[0]
+            # Leaving WAL needs exclusive access, which a running server prevents
+            if name == 'journal_mode' and str(current).lower() == 'wal':
+                continue
+            previous[name] = current
+            cursor.execute(f'PRAGMA {name} = {value}')
+    try:
+        yield
+    finally:
+        with connection.cursor() as cursor:
+            for name, value in previous.items():
+                cursor.execute(f'PRAGMA {name} = {value}')
+
+
+INSERT_FIELDS = ('amount', 'category', 'description', 'date', 'created_at', 'updated_at')
+
+
+def insert_rows(rows):
+    """Insert tuples of INSERT_FIELDS values into the expenses table."""
+    quote = connection.ops.quote_name
+    table = quote(Expense._meta.db_table)
+    columns = ', '.join(quote(Expense._meta.get_field(name).column) for name in INSERT_FIELDS)
+    placeholder = '(' + ', '.join(['%s'] * len(INSERT_FIELDS)) + ')'
+    with connection.cursor() as cursor:
+        if connection.vendor == 'sqlite':
+            cursor.executemany(f'INSERT INTO {table} ({columns}) VALUES {placeholder}', rows)
+            return
+        per_statement = (connection.features.max_query_params or 65535) // len(INSERT_FIELDS)
+        for start in range(0, len(rows), per_statement):
+            chunk = rows[start:start + per_statement]
+            values = ', '.join([placeholder] * len(chunk))
+            cursor.execute(
+                f'INSERT INTO {table} ({columns}) VALUES {values}',
+                [value for row in chunk for value in row]
+            )
+
+
+def parse_date(value):
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        raise CommandError(f'Invalid date "{value}", expected YYYY-MM-DD.')
+
+
+class Command(BaseCommand):
+    help = 'Insert synthetic expenses in large batched transactions.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--count', type=int, default=100000, help='Number of expenses to create.')
+        parser.add_argument('--batch-size', type=int, default=20000, help='Rows per transaction.')
+        parser.add_argument('--start-date', help='First date to generate (YYYY-MM-DD). Default: a year before --end-date.')
+        parser.add_argument('--end-date', help='Last date to generate (YYYY-MM-DD). Default: today.')
+        parser.add_argument(
+            '--categories',
+            help='Comma-separated categories to use (default: all). Repeat a name to weight it.'
+        )
+        parser.add_argument('--seed', type=int, default=42, help='Random seed, for reproducible data.')
+        parser.add_argument('--clear', action='store_true', help='Delete all existing expenses first.')
+
+    def handle(self, *args, **options):
+        count = options['count']
+        batch_size = options['batch_size']
+        if count < 0 or batch_size <= 0:
+            raise CommandError('--count must be >= 0 and --batch-size > 0.')
+
+        end = parse_date(options['end_date']) if options['end_date'] else date.today()
+        start = parse_date(options['start_date']) if options['start_date'] else end - timedelta(days=364)
+        if start > end:
+            raise CommandError('--start-date must not be after --end-date.')
+        days = [
+            connection.ops.adapt_datefield_value(start + timedelta(days=offset))
+            for offset in range((end - start).days + 1)
+        ]
+
+        valid = [value for value, _ in Expense.CATEGORY_CHOICES]
+        categories = valid
+        if options['categories']:
+            categories = [name.strip() for name in options['categories'].split(',') if name.strip()]
+            unknown = set(categories) - set(valid)
+            if unknown:
+                raise CommandError(f'Unknown categories: {", ".join(sorted(unknown))}')
+
+        rng = random.Random(options['seed'])
+
+        started = time.perf_counter()
+        with sqlite_load_pragmas(), search_index_suspended():
+            if options['clear']:
+                # Plain QuerySet: skip rollup deltas, the rollup is rebuilt below.
+                # Tombstones are still recorded so changes-feed clients drop the rows
+                cleared = models.QuerySet(Expense)
+                with transaction.atomic():
+                    ExpenseTombstone.objects.record(cleared.values_list('id', flat=True).iterator())
+                    cleared.delete()
+            created = 0
+            while created < count:
+                size = min(batch_size, count - created)
+                now = connection.ops.adapt_datetimefield_value(timezone.now())
+                batch = []
+                for _ in range(size):
+                    category = rng.choice(categories)
+                    cents = rng.randint(100, 500000)
+                    batch.append((
+                        f'{cents // 100}.{cents % 100:02d}',
+                        category,
+                        rng.choice(DESCRIPTIONS[category]),
+                        rng.choice(days),
+                        now,
+                        now,
+                    ))
+                with transaction.atomic():
+                    insert_rows(batch)
+                created += size
+                self.stderr.write(f'  {created}/{count} rows', ending='\r')
+            buckets = ExpenseRollup.objects.rebuild()
+        invalidate_on_commit(deletes=options['clear'])
+
+        elapsed = time.perf_counter() - started
+        self.stderr.write('')
+        self.stdout.write(self.style.SUCCESS(
+            f'Created {created} expense(s) in {elapsed:.1f}s '
+            f'({created / max(elapsed, 1e-9):.0f} rows/s); rebuilt {buckets} rollup bucket(s).'
+        ))
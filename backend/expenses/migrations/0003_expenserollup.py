@@ -0,0 +1,48 @@
+# Generated by Django 4.2.7 on 2026-10-18 17:10
+
+from decimal import Decimal
+from django.db import migrations, models
+from django.db.models import Count, Sum
+
+
+def populate_rollups(apps, schema_editor):
+    """Build the rollup from any expenses that already exist."""
+    Expense = apps.get_model('expenses', 'Expense')
+    ExpenseRollup = apps.get_model('expenses', 'ExpenseRollup')
+    groups = (
+        Expense.objects.order_by()
+        .values('date', 'category')
+        .annotate(count=Count('id'), total=Sum('amount'))
+    )
+    ExpenseRollup.objects.bulk_create(
+        [ExpenseRollup(**group) for group in groups.iterator()],
+        batch_size=1000
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('expenses', '0002_rename_expenses_ex_categor_idx_expenses_ex_categor_fcaba7_idx_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ExpenseRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('category', models.CharField(choices=[('food', 'Food'), ('transport', 'Transport'), ('entertainment', 'Entertainment'), ('utilities', 'Utilities'), ('shopping', 'Shopping'), ('health', 'Health'), ('other', 'Other')], max_length=50)),
+                ('count', models.IntegerField(default=0)),
+                ('total', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=14)),
+            ],
+            options={
+                'ordering': ['date', 'category'],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='expenserollup',
+            constraint=models.UniqueConstraint(fields=('date', 'category'), name='expenses_rollup_date_category_uniq'),
+        ),
+        migrations.RunPython(populate_rollups, migrations.RunPython.noop),
+    ]
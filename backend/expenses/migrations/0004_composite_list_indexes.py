@@ -0,0 +1,29 @@
+# Generated by Django 4.2.7 on 2026-10-18 17:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('expenses', '0003_expenserollup'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='expense',
+            index=models.Index(fields=['category', 'date', 'created_at', 'id'], include=('amount',), name='expenses_cat_date_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='expense',
+            index=models.Index(fields=['date', 'created_at', 'id'], include=('amount',), name='expenses_date_created_idx'),
+        ),
+        migrations.RemoveIndex(
+            model_name='expense',
+            name='expenses_ex_categor_fcaba7_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='expense',
+            name='expenses_ex_date_2850f8_idx',
+        ),
+    ]
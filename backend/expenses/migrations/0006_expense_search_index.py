@@ -0,0 +1,33 @@
+# Generated by Django 4.2.7 on 2026-10-18 17:42
+
+from django.db import migrations, models
+import django.db.models.deletion
+import expenses.search
+
+
+def create_search_index(apps, schema_editor):
+    """Create the FTS5 table (SQLite) or GIN index (PostgreSQL) and backfill it."""
+    expenses.search.install_search_index(schema_editor.connection)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('expenses', '0005_amount_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ExpenseSearchEntry',
+            fields=[
+                ('expense', models.OneToOneField(db_column='rowid', db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, primary_key=True, related_name='search_entry', serialize=False, to='expenses.expense')),
+                ('document', expenses.search.FTSMatchField(db_column='expenses_expense_fts')),
+                ('rank', models.FloatField()),
+            ],
+            options={
+                'db_table': 'expenses_expense_fts',
+                'managed': False,
+            },
+        ),
+        migrations.RunPython(create_search_index, migrations.RunPython.noop),
+    ]
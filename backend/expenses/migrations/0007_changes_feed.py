@@ -0,0 +1,32 @@
+# Generated by Django 4.2.7 on 2026-10-18 17:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('expenses', '0006_expense_search_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ExpenseTombstone',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('expense_id', models.IntegerField()),
+                ('deleted_at', models.DateTimeField()),
+            ],
+            options={
+                'ordering': ['deleted_at', 'expense_id'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='expense',
+            index=models.Index(fields=['updated_at', 'id'], name='expenses_updated_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='expensetombstone',
+            index=models.Index(fields=['deleted_at', 'expense_id'], name='expenses_tombstone_idx'),
+        ),
+    ]
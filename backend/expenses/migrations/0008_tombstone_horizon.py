@@ -0,0 +1,21 @@
+# Generated by Django 4.2.7 on 2026-10-18 18:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('expenses', '0007_changes_feed'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TombstoneHorizon',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('deleted_at', models.DateTimeField()),
+                ('expense_id', models.IntegerField()),
+            ],
+        ),
+    ]
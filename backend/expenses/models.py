@@ -1,10 +1,89 @@
 """
 Models for the expenses app.
 """
-from django.db import models
+from django.db import IntegrityError, models, transaction
+from django.db.models import Count, F, Q, Sum
+from django.utils import timezone
 from decimal import Decimal
 import uuid
 
+from .cache import invalidate_on_commit
+from .search import FTS_TABLE, FTSMatchField
+
+
+ROLLUP_FIELDS = ('date', 'category', 'amount')
+
+
+def _rollup_deltas(rows, sign=1):
+    """
+    Fold (date, category, amount) rows into {(date, category): [count, total]}.
+    """
+    deltas = {}
+    for day, category, amount in rows:
+        bucket = deltas.setdefault((day, category), [0, Decimal('0.00')])
+        bucket[0] += sign
+        bucket[1] += sign * Decimal(str(amount))
+    return deltas
+
+
+class ExpenseQuerySet(models.QuerySet):
+    """
+    QuerySet that keeps ExpenseRollup in step with bulk writes.
+    Each bulk operation and its rollup update share one transaction, and
+    the response cache is invalidated once it commits. Deletes leave
+    ExpenseTombstone rows and updates bump updated_at, for the changes feed.
+    """
+    
+    def bulk_create(self, objs, *args, **kwargs):
+        objs = list(objs)
+        with transaction.atomic(using=self.db):
+            objs = super().bulk_create(objs, *args, **kwargs)
+            rows = [obj._rollup_row() for obj in objs]
+            if kwargs.get('ignore_conflicts') or kwargs.get('update_conflicts'):
+                # We can't tell which rows were written, so recount the buckets
+                ExpenseRollup.objects.rebuild({row[:2] for row in rows})
+            else:
+                ExpenseRollup.objects.apply_deltas(_rollup_deltas(rows))
+            invalidate_on_commit(using=self.db)
+        return objs
+    
+    def delete(self):
+        with transaction.atomic(using=self.db):
+            groups = (
+                self.order_by()
+                .values('date', 'category')
+                .annotate(count=Count('id'), total=Sum('amount'))
+            )
+            deltas = {
+                (group['date'], group['category']): [-group['count'], -group['total']]
+                for group in groups
+            }
+            ids = list(self.order_by().values_list('id', flat=True))
+            result = super().delete()
+            ExpenseRollup.objects.apply_deltas(deltas)
+            ExpenseTombstone.objects.record(ids)
+            invalidate_on_commit(using=self.db, deletes=True)
+        return result
+    
+    delete.alters_data = True
+    delete.queryset_only = True
+    
+    def update(self, **kwargs):
+        # auto_now only applies to save(); the changes feed relies on it
+        kwargs.setdefault('updated_at', timezone.now())
+        with transaction.atomic(using=self.db):
+            invalidate_on_commit(using=self.db)
+            if not set(kwargs) & set(ROLLUP_FIELDS):
+                return super().update(**kwargs)
+            pks = list(self.values_list('pk', flat=True))
+            before = set(self.model.objects.filter(pk__in=pks).values_list('date', 'category'))
+            rows = super().update(**kwargs)
+            after = set(self.model.objects.filter(pk__in=pks).values_list('date', 'category'))
+            ExpenseRollup.objects.rebuild(before | after)
+        return rows
+    
+    update.alters_data = True
+
 
 class Expense(models.Model):
     """Model to represent an expense entry."""
@@ -46,12 +125,249 @@ class Expense(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    objects = ExpenseQuerySet.as_manager()
+    
     class Meta:
         ordering = ['-date', '-created_at']
+        # Composite indexes match filter_expenses(): an optional category
+        # equality followed by (date, created_at, id) in either direction, so
+        # rows come back in index order with no separate sort step. Where the
+        # backend supports INCLUDE (PostgreSQL), amount rides along so sums
+        # over a filtered range are answered from the index alone. A plain
+        # amount index serves min_amount/max_amount filters on their own.
         indexes = [
-            models.Index(fields=['category']),
-            models.Index(fields=['-date']),
+            models.Index(
+                fields=['category', 'date', 'created_at', 'id'],
+                include=['amount'],
+                name='expenses_cat_date_created_idx',
+            ),
+            models.Index(
+                fields=['date', 'created_at', 'id'],
+                include=['amount'],
+                name='expenses_date_created_idx',
+            ),
+            models.Index(fields=['amount'], name='expenses_amount_idx'),
+            # The changes feed seeks and orders by (updated_at, id)
+            models.Index(fields=['updated_at', 'id'], name='expenses_updated_idx'),
         ]
     
     def __str__(self):
         return f"{self.category}: ₹{self.amount} - {self.description}"
+    
+    def _rollup_row(self):
+        """Return this expense's (date, category, amount) with Python types."""
+        return tuple(
+            self._meta.get_field(name).to_python(getattr(self, name))
+            for name in ROLLUP_FIELDS
+        )
+    
+    def save(self, *args, **kwargs):
+        """Save the expense and adjust its rollup bucket in the same transaction."""
+        with transaction.atomic(using=kwargs.get('using')):
+            rows = []
+            if not self._state.adding:
+                rows = list(
+                    Expense.objects.filter(pk=self.pk).values_list(*ROLLUP_FIELDS)
+                )
+            super().save(*args, **kwargs)
+            deltas = _rollup_deltas(rows, sign=-1)
+            for key, (count, total) in _rollup_deltas([self._rollup_row()]).items():
+                bucket = deltas.setdefault(key, [0, Decimal('0.00')])
+                bucket[0] += count
+                bucket[1] += total
+            ExpenseRollup.objects.apply_deltas(deltas)
+            invalidate_on_commit(using=kwargs.get('using'))
+    
+    def delete(self, *args, **kwargs):
+        """Delete the expense and remove it from its rollup bucket."""
+        with transaction.atomic(using=kwargs.get('using')):
+            expense_id = self.pk
+            result = super().delete(*args, **kwargs)
+            ExpenseRollup.objects.apply_deltas(_rollup_deltas([self._rollup_row()], sign=-1))
+            ExpenseTombstone.objects.record([expense_id])
+            invalidate_on_commit(using=kwargs.get('using'), deletes=True)
+        return result
+
+
+class ExpenseRollupQuerySet(models.QuerySet):
+    """Maintenance operations for the (date, category) rollup."""
+    
+    def apply_deltas(self, deltas):
+        """
+        Add {(date, category): [count, total]} deltas to the matching buckets,
+        creating missing buckets and dropping ones that become empty.
+        """
+        for (day, category), (count, total) in deltas.items():
+            if not count and not total:
+                continue
+            bucket = self.filter(date=day, category=category)
+            changes = {'count': F('count') + count, 'total': F('total') + total}
+            if not bucket.update(**changes):
+                try:
+                    with transaction.atomic(using=self.db):
+                        self.create(date=day, category=category, count=count, total=total)
+                except IntegrityError:
+                    # Another transaction created the bucket first
+                    bucket.update(**changes)
+            if count < 0:
+                bucket.filter(count__lte=0).delete()
+    
+    def rebuild(self, keys=None):
+        """
+        Recompute buckets from the expenses table.
+        With ``keys`` only those (date, category) buckets are rebuilt.
+        """
+        expenses = Expense.objects.order_by()
+        buckets = self
+        if keys is not None:
+            if not keys:
+                return 0
+            match = Q()
+            for day, category in keys:
+                match |= Q(date=day, category=category)
+            expenses = expenses.filter(match)
+            buckets = buckets.filter(match)
+        with transaction.atomic(using=self.db):
+            buckets.delete()
+            groups = (
+                expenses.values('date', 'category')
+                .annotate(count=Count('id'), total=Sum('amount'))
+            )
+            created = self.bulk_create(
+                [ExpenseRollup(**group) for group in groups.iterator()],
+                batch_size=1000
+            )
+        return len(created)
+
+
+class ExpenseRollup(models.Model):
+    """
+    Pre-aggregated count and sum of expenses per (date, category).
+    Kept current by Expense.save/delete and ExpenseQuerySet bulk writes, so
+    totals can be answered in O(days x categories) instead of O(rows).
+    Rebuild from scratch with ``manage.py rebuild_expense_rollups``.
+    """
+    
+    date = models.DateField()
+    category = models.CharField(
+        max_length=50,
+        choices=Expense.CATEGORY_CHOICES
+    )
+    count = models.IntegerField(default=0)
+    total = models.DecimalField(max_digits=14, decimal_places=2, default=Decimal('0.00'))
+    
+    objects = ExpenseRollupQuerySet.as_manager()
+    
+    class Meta:
+        ordering = ['date', 'category']
+        constraints = [
+            models.UniqueConstraint(fields=['date', 'category'], name='expenses_rollup_date_category_uniq'),
+        ]
+    
+    def __str__(self):
+        return f"{self.date} {self.category}: {self.count} / ₹{self.total}"
+
+
+class ExpenseSearchEntry(models.Model):
+    """
+    A row of the SQLite FTS5 index over expense text, joined to Expense by
+    rowid so searches can filter and rank in one query. Unmanaged: the
+    table and the triggers that keep it in sync are created by
+    expenses.search.install_search_index(), and exist only on SQLite.
+    """
+    
+    expense = models.OneToOneField(
+        Expense,
+        primary_key=True,
+        db_column='rowid',
+        db_constraint=False,
+        on_delete=models.DO_NOTHING,
+        related_name='search_entry'
+    )
+    document = FTSMatchField(db_column=FTS_TABLE)
+    rank = models.FloatField()
+    
+    class Meta:
+        managed = False
+        db_table = FTS_TABLE
+
+
+class ExpenseTombstoneQuerySet(models.QuerySet):
+    """Recording and expiring deletions for the changes feed."""
+    
+    def record(self, ids):
+        """Remember that the expenses with these ids were deleted just now."""
+        deleted_at = timezone.now()
+        return self.bulk_create(
+            [ExpenseTombstone(expense_id=expense_id, deleted_at=deleted_at) for expense_id in ids],
+            batch_size=1000
+        )
+    
+    def prune(self, before):
+        """
+        Forget deletions older than ``before``, moving the TombstoneHorizon
+        up to the newest one forgotten.
+        """
+        with transaction.atomic(using=self.db):
+            expired = self.filter(deleted_at__lt=before)
+            newest = expired.order_by('-deleted_at', '-expense_id').values_list('deleted_at', 'expense_id').first()
+            if newest is None:
+                return 0
+            pruned = expired.delete()[0]
+            TombstoneHorizon.objects.using(self.db).advance(*newest)
+        return pruned
+    
+    def horizon(self):
+        """Position (deleted_at, expense_id) of the newest pruned deletion, or None."""
+        return TombstoneHorizon.objects.using(self.db).filter(pk=1).values_list('deleted_at', 'expense_id').first()
+
+
+class ExpenseTombstone(models.Model):
+    """
+    A deleted expense, kept so the changes feed can tell clients to drop it.
+    Written by Expense.delete and ExpenseQuerySet.delete; rows older than
+    EXPENSES_TOMBSTONE_RETENTION_DAYS are removed by
+    ``manage.py prune_expense_tombstones``, which advances TombstoneHorizon.
+    """
+    
+    expense_id = models.IntegerField()
+    deleted_at = models.DateTimeField()
+    
+    objects = ExpenseTombstoneQuerySet.as_manager()
+    
+    class Meta:
+        ordering = ['deleted_at', 'expense_id']
+        indexes = [
+            models.Index(fields=['deleted_at', 'expense_id'], name='expenses_tombstone_idx'),
+        ]
+    
+    def __str__(self):
+        return f"expense {self.expense_id} deleted {self.deleted_at}"
+
+
+class TombstoneHorizonQuerySet(models.QuerySet):
+    
+    def advance(self, deleted_at, expense_id):
+        """Move the horizon to (deleted_at, expense_id) unless it is already past it."""
+        horizon, created = self.select_for_update().get_or_create(
+            pk=1, defaults={'deleted_at': deleted_at, 'expense_id': expense_id}
+        )
+        if not created and (horizon.deleted_at, horizon.expense_id) < (deleted_at, expense_id):
+            horizon.deleted_at, horizon.expense_id = deleted_at, expense_id
+            horizon.save(update_fields=['deleted_at', 'expense_id'])
+
+
+class TombstoneHorizon(models.Model):
+    """
+    The single row recording the newest ExpenseTombstone ever pruned. A
+    changes-feed watermark before it may have missed deletions, so the feed
+    answers it with 410 Gone; later watermarks stay valid however old.
+    """
+    
+    deleted_at = models.DateTimeField()
+    expense_id = models.IntegerField()
+    
+    objects = TombstoneHorizonQuerySet.as_manager()
+    
+    def __str__(self):
+        return f"tombstones pruned through expense {self.expense_id} at {self.deleted_at}"
@@ -0,0 +1,201 @@
+"""
+Pagination classes for the expenses app.
+"""
+import base64
+import json
+from datetime import date, datetime
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination, _positive_int
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class ExpensePageNumberPagination(PageNumberPagination):
+    """Page-number pagination with a client-selectable ``page_size``."""
+
+    page_size_query_param = 'page_size'
+
+    @property
+    def max_page_size(self):
+        return settings.EXPENSES_MAX_PAGE_SIZE
+
+
+class KeysetPagination(BasePagination):
+    """
+    Cursor (keyset) pagination over the queryset's own ordering.
+
+    Instead of OFFSET/COUNT, each page seeks past the last row of the
+    previous one using a WHERE clause on the ordering columns, so deep pages
+    cost the same as the first. The cursor is an opaque, URL-safe token
+    holding the ordering values of the boundary row.
+    """
+
+    page_size = api_settings.PAGE_SIZE
+    page_size_query_param = 'page_size'
+    cursor_query_param = 'cursor'
+    mode_query_param = 'pagination'
+    mode_query_value = 'cursor'
+    invalid_cursor_message = 'Invalid cursor'
+
+    @classmethod
+    def is_requested(cls, request):
+        """Return True if the client asked for cursor pagination."""
+        params = request.query_params
+        return (
+            cls.cursor_query_param in params
+            or params.get(cls.mode_query_param) == cls.mode_query_value
+        )
+
+    @property
+    def max_page_size(self):
+        return settings.EXPENSES_MAX_PAGE_SIZE
+
+    def get_page_size(self, request):
+        try:
+            return _positive_int(
+                request.query_params[self.page_size_query_param],
+                strict=True,
+                cutoff=self.max_page_size
+            )
+        except (KeyError, ValueError):
+            return self.page_size
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        self.base_url = request.build_absolute_uri()
+        self.ordering = [field.lstrip('-') for field in queryset.query.order_by]
+        self.descending = queryset.query.order_by[0].startswith('-')
+        self.fields = [self._ordering_field(queryset, name) for name in self.ordering]
+
+        position, reverse = self.decode_cursor(request)
+        descending = self.descending != reverse
+        if reverse:
+            queryset = queryset.reverse()
+        if position is not None:
+            queryset = queryset.filter(self._seek(position, descending))
+
+        results = list(queryset[:self.page_size + 1])
+        has_more = len(results) > self.page_size
+        results = results[:self.page_size]
+        if reverse:
+            results.reverse()
+            self.has_next = position is not None
+            self.has_previous = has_more
+        else:
+            self.has_next = has_more
+            self.has_previous = position is not None
+
+        self.page = results
+        return results
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(self.page[-1], reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous or not self.page:
+            return None
+        return self.encode_cursor(self.page[0], reverse=True)
+
+    def encode_cursor(self, obj, reverse):
+        """Build the absolute URL for the page on either side of ``obj``."""
+        token = self.make_token([getattr(obj, field) for field in self.ordering], reverse)
+        url = remove_query_param(self.base_url, self.mode_query_param)
+        return replace_query_param(url, self.cursor_query_param, token)
+
+    @classmethod
+    def make_token(cls, position, reverse=False):
+        """Encode ordering values as an opaque cursor token."""
+        payload = {'p': [cls._dump(value) for value in position]}
+        if reverse:
+            payload['r'] = 1
+        return base64.urlsafe_b64encode(
+            json.dumps(payload, separators=(',', ':')).encode('ascii')
+        ).decode('ascii').rstrip('=')
+
+    def decode_cursor(self, request):
+        """Return ``(position, reverse)`` for the request's cursor, if any."""
+        token = request.query_params.get(self.cursor_query_param)
+        if not token:
+            return None, False
+        try:
+            position, reverse = self.read_token(token)
+        except ValueError:
+            raise NotFound(self.invalid_cursor_message)
+        if len(position) != len(self.ordering):
+            raise NotFound(self.invalid_cursor_message)
+        # Tampered or stale tokens may hold values of the wrong type
+        try:
+            position = [field.to_python(value) for field, value in zip(self.fields, position)]
+        except (ValidationError, TypeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+        if any(value is None for value in position):
+            raise NotFound(self.invalid_cursor_message)
+        return position, reverse
+
+    @classmethod
+    def read_token(cls, token):
+        """Decode a make_token() token to ``(position, reverse)``; ValueError if malformed."""
+        try:
+            padded = token + '=' * (-len(token) % 4)
+            payload = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+            position = payload['p']
+            reverse = bool(payload.get('r'))
+        except (TypeError, ValueError, KeyError, UnicodeEncodeError):
+            raise ValueError(f'Invalid token "{token}".')
+        if not isinstance(position, list):
+            raise ValueError(f'Invalid token "{token}".')
+        return position, reverse
+
+    def _seek(self, position, descending):
+        """
+        Build the row-value comparison ``(a, b, c) < (x, y, z)`` as an OR of
+        prefixes so every backend can use the composite ordering index.
+        """
+        lookup = 'lt' if descending else 'gt'
+        condition = Q()
+        for index, field in enumerate(self.ordering):
+            prefix = dict(zip(self.ordering[:index], position[:index]))
+            prefix[f'{field}__{lookup}'] = position[index]
+            condition |= Q(**prefix)
+        return condition
+
+    @staticmethod
+    def _ordering_field(queryset, name):
+        """The model field or annotation output field a cursor value is parsed with."""
+        if name in queryset.query.annotations:
+            return queryset.query.annotations[name].output_field
+        if name == 'pk':
+            return queryset.model._meta.pk
+        return queryset.model._meta.get_field(name)
+
+    @staticmethod
+    def _dump(value):
+        if isinstance(value, (date, datetime)):
+            return value.isoformat()
+        return value
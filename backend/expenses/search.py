@@ -0,0 +1,167 @@
+"""
+Full-text search over expense descriptions and categories.
+
+SQLite keeps an external-content FTS5 table, expenses_expense_fts, in step
+with the expenses table through triggers, so every write path (ORM saves,
+bulk_create, queryset update/delete, raw loads) updates it in the same
+transaction. PostgreSQL uses a GIN index on to_tsvector('simple', ...).
+Other backends fall back to an unindexed icontains match.
+
+Queries are split into words and each word is matched as a prefix, all
+words required; results carry a ``search_rank`` annotation where higher
+is more relevant.
+"""
+import re
+from contextlib import contextmanager
+
+from django.db import connection as default_connection
+from django.db.models import F, FloatField, Lookup, Q, TextField, Value
+
+FTS_TABLE = 'expenses_expense_fts'
+SEARCH_CONFIG = 'simple'
+SEARCH_INDEX_NAME = 'expenses_search_idx'
+WORD_RE = re.compile(r'\w+')
+
+SQLITE_SCHEMA = [
+    # unicode61 folds case and diacritics; prefix indexes make "gro*" cheap
+    f"""CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        description, category,
+        content='expenses_expense', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+    )""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_insert AFTER INSERT ON expenses_expense BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, description, category)
+        VALUES (new.id, new.description, new.category);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_delete AFTER DELETE ON expenses_expense BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, description, category)
+        VALUES ('delete', old.id, old.description, old.category);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_update AFTER UPDATE OF description, category
+    ON expenses_expense BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, description, category)
+        VALUES ('delete', old.id, old.description, old.category);
+        INSERT INTO {FTS_TABLE}(rowid, description, category)
+        VALUES (new.id, new.description, new.category);
+    END""",
+]
+SQLITE_TRIGGERS = {f'{FTS_TABLE}_insert', f'{FTS_TABLE}_delete', f'{FTS_TABLE}_update'}
+
+
+class FTSMatchField(TextField):
+    """The FTS5 hidden column named after its table, the left side of MATCH."""
+
+
+@FTSMatchField.register_lookup
+class Match(Lookup):
+    lookup_name = 'match'
+
+    def as_sql(self, compiler, connection):
+        lhs, lhs_params = self.process_lhs(compiler, connection)
+        rhs, rhs_params = self.process_rhs(compiler, connection)
+        return f'{lhs} MATCH {rhs}', lhs_params + rhs_params
+
+
+def search_vector():
+    from django.contrib.postgres.search import SearchVector
+    return SearchVector('description', 'category', config=SEARCH_CONFIG)
+
+
+def search_index():
+    """The PostgreSQL expression index matching search_vector()."""
+    from django.contrib.postgres.indexes import GinIndex
+    return GinIndex(search_vector(), name=SEARCH_INDEX_NAME)
+
+
+def install_search_index(connection=None):
+    """
+    Create the backend's search index if it is missing, backfilling it from
+    existing rows. Safe to call repeatedly; SQLite table rebuilds during
+    migrations drop triggers, so this also runs after every migrate.
+    """
+    connection = connection or default_connection
+    with connection.cursor() as cursor:
+        if connection.vendor == 'sqlite':
+            cursor.execute(
+                "SELECT name FROM sqlite_master WHERE name = %s OR (type = 'trigger' AND tbl_name = %s)",
+                [FTS_TABLE, 'expenses_expense']
+            )
+            existing = {row[0] for row in cursor.fetchall()}
+            if SQLITE_TRIGGERS | {FTS_TABLE} <= existing:
+                return False
+            for statement in SQLITE_SCHEMA:
+                cursor.execute(statement)
+            cursor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')")
+            return True
+        if connection.vendor == 'postgresql':
+            from .models import Expense
+            if SEARCH_INDEX_NAME in connection.introspection.get_constraints(cursor, Expense._meta.db_table):
+                return False
+            with connection.schema_editor() as schema_editor:
+                schema_editor.add_index(Expense, search_index())
+            return True
+    return False
+
+
+@contextmanager
+def search_index_suspended(connection=None):
+    """
+    Stop per-row index maintenance for a bulk load and rebuild the index
+    once afterwards through install_search_index(). On SQLite the FTS
+    triggers are dropped; on PostgreSQL the GIN index is.
+    """
+    connection = connection or default_connection
+    if connection.vendor == 'sqlite':
+        with connection.cursor() as cursor:
+            for trigger in sorted(SQLITE_TRIGGERS):
+                cursor.execute(f'DROP TRIGGER IF EXISTS {trigger}')
+    elif connection.vendor == 'postgresql':
+        from .models import Expense
+        with connection.cursor() as cursor:
+            indexed = SEARCH_INDEX_NAME in connection.introspection.get_constraints(cursor, Expense._meta.db_table)
+        if indexed:
+            with connection.schema_editor() as schema_editor:
+                schema_editor.remove_index(Expense, search_index())
+    try:
+        yield
+    finally:
+        install_search_index(connection)
+
+
+def search_terms(query):
+    """Lower-cased words of the query, in order, without duplicates."""
+    return list(dict.fromkeys(word.lower() for word in WORD_RE.findall(query or '')))
+
+
+def search_expenses(queryset, query):
+    """
+    Filter ``queryset`` to expenses matching every word of ``query`` (as a
+    prefix) and annotate ``search_rank``. The queryset's ordering is left
+    alone; order by ``-search_rank`` for relevance.
+    """
+    terms = search_terms(query)
+    if not terms:
+        return queryset.none().annotate(search_rank=Value(0.0, output_field=FloatField()))
+    vendor = default_connection.vendor
+
+    if vendor == 'sqlite':
+        # Joins the FTS table through ExpenseSearchEntry, so the match drives
+        # the query and bm25() (lower is better, hence negated) runs once per hit
+        match = ' '.join(f'"{term}"*' for term in terms)
+        return queryset.filter(search_entry__document__match=match).annotate(
+            search_rank=-F('search_entry__rank')
+        )
+
+    if vendor == 'postgresql':
+        from django.contrib.postgres.search import SearchQuery, SearchRank
+        search = SearchQuery(
+            ' & '.join(f'{term}:*' for term in terms), search_type='raw', config=SEARCH_CONFIG
+        )
+        return queryset.annotate(search_document=search_vector()).filter(
+            search_document=search
+        ).annotate(search_rank=SearchRank(F('search_document'), search))
+
+    condition = Q()
+    for term in terms:
+        condition &= Q(description__icontains=term) | Q(category__icontains=term)
+    return queryset.filter(condition).annotate(search_rank=Value(0.0, output_field=FloatField()))
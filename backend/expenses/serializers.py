@@ -39,3 +39,11 @@ class ExpenseSerializer(serializers.ModelSerializer):
         if not data.get('category'):
             raise serializers.ValidationError({'category': 'Category is required.'})
         return data
+
+
+class ExpenseChangeSerializer(ExpenseSerializer):
+    """An expense as it appears in the changes feed, with its modification time."""
+    
+    class Meta(ExpenseSerializer.Meta):
+        fields = ExpenseSerializer.Meta.fields + ['updated_at']
+        read_only_fields = ExpenseSerializer.Meta.read_only_fields + ['updated_at']
@@ -3,6 +3,7 @@ URL configuration for the expenses app.
 """
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
+from . import async_views
 from .views import ExpenseViewSet
 
 router = DefaultRouter()
@@ -10,4 +11,8 @@ router.register(r'expenses', ExpenseViewSet, basename='expense')
 
 urlpatterns = [
     path('', include(router.urls)),
+    # Native async endpoints, for ASGI deployments
+    path('async/expenses/', async_views.expense_list, name='async-expense-list'),
+    path('async/expenses/total/', async_views.expense_total, name='async-expense-total'),
+    path('async/expenses/categories/', async_views.expense_categories, name='async-expense-categories'),
 ]
@@ -1,100 +1,561 @@
 """
 Views for the expenses app.
 """
+import hashlib
+from urllib.parse import urlencode
+
 from rest_framework import viewsets, status
 from rest_framework.response import Response
 from rest_framework.decorators import action
-from django.db.models import Q, Sum
+from rest_framework.exceptions import ValidationError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import BrowsableAPIRenderer
+from rest_framework.utils.urls import replace_query_param
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.db import IntegrityError, transaction
+from django.db.models import Count, Q, Sum
+from django.http import StreamingHttpResponse
 from django.utils.decorators import method_decorator
 from django.views.decorators.http import condition
 from django.core.exceptions import ObjectDoesNotExist
+from datetime import date
 from decimal import Decimal
 
-from .models import Expense
+from .cache import cache_stats, cached_response, get_generation
+from .changes import changes_since, decode_watermark, encode_watermark, is_expired, serialize_changes
+from .idempotency import recent_responses
+from .export import EXPORT_FORMATS, get_converters, iterate_async, serialize_rows
+from .models import Expense, ExpenseRollup
+from .pagination import ExpensePageNumberPagination, KeysetPagination
+from .parsers import NDJSONParser
+from .renderers import CSVRenderer, FastJSONRenderer, NDJSONRenderer
+from .search import search_expenses
 from .serializers import ExpenseSerializer
 
 
+def _parse_filter(params, name, parse, message):
+    value = params.get(name)
+    if value in (None, ''):
+        return None
+    try:
+        return parse(value)
+    except (ValueError, ArithmeticError):
+        raise ValidationError({name: [message]})
+
+
+def _parse_amount(value):
+    amount = Decimal(value)
+    if not amount.is_finite():
+        raise ValueError(value)
+    return amount
+
+
+def parse_filters(params):
+    """
+    Validate the filter query parameters shared by every expense endpoint.
+    Returns a dict with 'categories' (a list, empty for all), 'date_from',
+    'date_to', 'min_amount', 'max_amount' and 'search' (None when absent). Raises
+    ValidationError for malformed dates or amounts.
+    """
+    categories = [name.strip() for name in params.get('category', '').split(',') if name.strip()]
+    if 'all' in categories:
+        categories = []
+    return {
+        'categories': sorted(set(categories)),
+        'date_from': _parse_filter(params, 'date_from', date.fromisoformat, 'Enter a valid date (YYYY-MM-DD).'),
+        'date_to': _parse_filter(params, 'date_to', date.fromisoformat, 'Enter a valid date (YYYY-MM-DD).'),
+        'min_amount': _parse_filter(params, 'min_amount', _parse_amount, 'Enter a valid amount.'),
+        'max_amount': _parse_filter(params, 'max_amount', _parse_amount, 'Enter a valid amount.'),
+        'search': params.get('search', '').strip() or None,
+    }
+
+
+def filter_expenses(params):
+    """
+    Filter and sort expenses based on query parameters.
+    Supports:
+    - category: one category, or several separated by commas
+    - date_from / date_to: inclusive date range (YYYY-MM-DD)
+    - min_amount / max_amount: inclusive amount range
+    - search: full-text match on description and category; results are
+      ordered by relevance unless a sort is given
+    - sort=date_desc: sort by date (newest first)
+
+    Category and date filters seek the composite (category, date, ...) and
+    (date, ...) indexes; amount-only filters seek the amount index. The
+    primary key is appended as a tie-breaker so the ordering is total,
+    which keyset pagination relies on.
+    """
+    filters = parse_filters(params)
+    queryset = Expense.objects.all()
+    
+    if len(filters['categories']) == 1:
+        queryset = queryset.filter(category=filters['categories'][0])
+    elif filters['categories']:
+        queryset = queryset.filter(category__in=filters['categories'])
+    if filters['date_from']:
+        queryset = queryset.filter(date__gte=filters['date_from'])
+    if filters['date_to']:
+        queryset = queryset.filter(date__lte=filters['date_to'])
+    if filters['min_amount'] is not None:
+        queryset = queryset.filter(amount__gte=filters['min_amount'])
+    if filters['max_amount'] is not None:
+        queryset = queryset.filter(amount__lte=filters['max_amount'])
+    if filters['search']:
+        queryset = search_expenses(queryset, filters['search'])
+        if 'sort' not in params:
+            return queryset.order_by('-search_rank', '-date', '-created_at', '-id')
+    
+    # Sort by date (newest first) by default, can be modified by sort parameter
+    sort_param = params.get('sort', 'date_desc')
+    if sort_param == 'date_asc':
+        queryset = queryset.order_by('date', 'created_at', 'id')
+    else:  # Default: date_desc
+        queryset = queryset.order_by('-date', '-created_at', '-id')
+    
+    return queryset
+
+
+def filter_rollups(params):
+    """
+    Return the ExpenseRollup rows matching filter_expenses(params), or None
+    when the filters can't be answered from the (date, category) rollup,
+    i.e. when an amount range or search is given.
+    """
+    filters = parse_filters(params)
+    if filters['min_amount'] is not None or filters['max_amount'] is not None or filters['search']:
+        return None
+    rollups = ExpenseRollup.objects.all()
+    if filters['categories']:
+        rollups = rollups.filter(category__in=filters['categories'])
+    if filters['date_from']:
+        rollups = rollups.filter(date__gte=filters['date_from'])
+    if filters['date_to']:
+        rollups = rollups.filter(date__lte=filters['date_to'])
+    return rollups
+
+
+def save_idempotent(serializer, idempotency_key):
+    """
+    Save a validated ExpenseSerializer under an idempotency key.
+    The INSERT runs inside a savepoint and the unique constraint arbitrates
+    races: if the key already exists (including when a concurrent retry won),
+    the original row is returned instead. Returns ``(data, created)``.
+    """
+    serializer.validated_data['idempotency_key'] = idempotency_key
+    try:
+        with transaction.atomic():
+            serializer.save()
+    except IntegrityError:
+        existing_expense = Expense.objects.filter(idempotency_key=idempotency_key).first()
+        if existing_expense is None:
+            raise
+        data = ExpenseSerializer(existing_expense).data
+        recent_responses.put(idempotency_key, data)
+        return data, False
+    recent_responses.put(idempotency_key, serializer.data)
+    return serializer.data, True
+
+
+def idempotency_key_error(key):
+    """Why ``key`` can't be stored as an idempotency key, or None if it can (or is absent)."""
+    if key is None:
+        return None
+    max_length = Expense._meta.get_field('idempotency_key').max_length
+    if not isinstance(key, str) or not key or len(key) > max_length:
+        return f'Must be a non-empty string of at most {max_length} characters.'
+    return None
+
+
+def format_amount(value):
+    """Render a (possibly NULL) sum as a two-decimal string."""
+    return str((value or Decimal('0')).quantize(Decimal('0.01')))
+
+
+def expense_etag(request, *args, **kwargs):
+    """
+    ETag for the request's filtered view, without touching the database.
+    The cache write generation changes on every committed create or delete,
+    so keying on it plus the normalized request identifies the response.
+    There is no Last-Modified: a deletion has no timestamp among the live
+    rows, and one-second resolution would hide writes within a second.
+    """
+    fingerprint = '|'.join([
+        request.path,
+        urlencode(sorted(request.query_params.lists()), doseq=True),
+        getattr(request, 'accepted_media_type', '') or '',
+        str(get_generation()),
+    ])
+    return hashlib.md5(fingerprint.encode('utf-8'), usedforsecurity=False).hexdigest()
+
+
+# Answer GET/HEAD with 304 Not Modified when the filtered view is unchanged
+conditional_on_expenses = method_decorator(condition(etag_func=expense_etag))
+
+
 class ExpenseViewSet(viewsets.ModelViewSet):
     """ViewSet for Expense CRUD operations with idempotency support."""
     
     queryset = Expense.objects.all()
     serializer_class = ExpenseSerializer
-    http_method_names = ['get', 'post', 'head', 'options']
+    pagination_class = ExpensePageNumberPagination
+    renderer_classes = [FastJSONRenderer, BrowsableAPIRenderer]
+    http_method_names = ['get', 'post', 'delete', 'head', 'options']
     
     def get_queryset(self):
+        """Filter and sort expenses based on query parameters."""
+        return filter_expenses(self.request.query_params)
+    
+    def get_rollup_queryset(self):
         """
-        Filter and sort expenses based on query parameters.
-        Supports:
-        - category: filter by category
-        - sort=date_desc: sort by date (newest first)
+        Return the ExpenseRollup rows matching the request's filters, or None
+        when the filters can't be answered from the (date, category) rollup.
         """
-        queryset = Expense.objects.all()
-        
-        # Filter by category if provided
-        category = self.request.query_params.get('category')
-        if category and category != 'all':
-            queryset = queryset.filter(category=category)
-        
-        # Sort by date (newest first) by default, can be modified by sort parameter
-        sort_param = self.request.query_params.get('sort', 'date_desc')
-        if sort_param == 'date_asc':
-            queryset = queryset.order_by('date', 'created_at')
-        else:  # Default: date_desc
-            queryset = queryset.order_by('-date', '-created_at')
-        
-        return queryset
+        return filter_rollups(self.request.query_params)
+    
+    @property
+    def paginator(self):
+        """
+        Use keyset pagination when the client passes ``cursor`` or
+        ``pagination=cursor``; otherwise fall back to page numbers.
+        """
+        if not hasattr(self, '_paginator'):
+            if KeysetPagination.is_requested(self.request):
+                self._paginator = KeysetPagination()
+            else:
+                self._paginator = super().paginator
+        return self._paginator
     
     def create(self, request, *args, **kwargs):
         """
         Create a new expense with idempotency support.
         Client can provide 'Idempotency-Key' header to ensure duplicate requests
         return the same expense.
+
+        Recently seen keys are replayed from memory without a query; see
+        save_idempotent() for how concurrent retries are resolved.
         """
         idempotency_key = request.headers.get('Idempotency-Key')
         
-        # If idempotency key is provided, check if this request was already processed
         if idempotency_key:
-            try:
-                existing_expense = Expense.objects.get(idempotency_key=idempotency_key)
-                serializer = self.get_serializer(existing_expense)
-                return Response(
-                    serializer.data,
-                    status=status.HTTP_200_OK,
-                    headers={'X-Idempotency': 'True'}
-                )
-            except Expense.DoesNotExist:
-                pass
+            replay = recent_responses.get(idempotency_key)
+            if replay is not None:
+                return self._replay(replay)
         
         # Create new expense
         serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
         
-        # Save with idempotency key if provided
-        if idempotency_key:
-            serializer.validated_data['idempotency_key'] = idempotency_key
+        if not idempotency_key:
+            self.perform_create(serializer)
+            headers = self.get_success_headers(serializer.data)
+            return Response(serializer.data, status=status.HTTP_201_CREATED, headers=headers)
         
-        self.perform_create(serializer)
-        headers = self.get_success_headers(serializer.data)
-        if idempotency_key:
-            headers['X-Idempotency'] = 'False'
+        data, created = save_idempotent(serializer, idempotency_key)
+        if not created:
+            return self._replay(data)
+        headers = self.get_success_headers(data)
+        headers['X-Idempotency'] = 'False'
         return Response(
-            serializer.data,
+            data,
             status=status.HTTP_201_CREATED,
             headers=headers
         )
     
+    def _replay(self, data):
+        """Respond with a previously created expense."""
+        return Response(
+            data,
+            status=status.HTTP_200_OK,
+            headers={'X-Idempotency': 'True'}
+        )
+    
+    @action(detail=False, methods=['post'], parser_classes=[JSONParser, NDJSONParser])
+    def bulk(self, request):
+        """
+        Create many expenses in one request.
+        Accepts a JSON array or an NDJSON body. Each item may carry its own
+        'idempotency_key'; items whose key already exists (in the database or
+        earlier in the same batch) are replayed instead of created.
+        """
+        items = request.data
+        if not isinstance(items, list) or not all(isinstance(item, dict) for item in items):
+            raise ValidationError({'detail': 'Expected a list of expense objects.'})
+        
+        items = [dict(item) for item in items]
+        keys, key_errors = [], {}
+        for index, item in enumerate(items):
+            key = item.pop('idempotency_key', None)
+            error = idempotency_key_error(key)
+            if error:
+                # Still validated below, so every problem with the item is reported
+                key_errors[index] = {'idempotency_key': [error]}
+                key = None
+            keys.append(key)
+        
+        # One IN query for every key the batch mentions
+        existing = {}
+        if any(keys):
+            existing = Expense.objects.in_bulk(
+                {key for key in keys if key}, field_name='idempotency_key'
+            )
+        
+        # Indexes of items that need inserting; repeated keys point at the first
+        pending, first_seen = [], {}
+        for index, key in enumerate(keys):
+            if key in existing:
+                continue
+            if key:
+                if key in first_seen:
+                    continue
+                first_seen[key] = index
+            pending.append(index)
+        
+        serializer = self.get_serializer(data=[items[i] for i in pending], many=True)
+        if not serializer.is_valid() or key_errors:
+            errors = [{} for _ in items]
+            for index, error in zip(pending, serializer.errors):
+                errors[index] = dict(error)
+            for index, error in key_errors.items():
+                errors[index].update(error)
+            raise ValidationError(errors)
+        
+        objects = [
+            Expense(idempotency_key=keys[index], **data)
+            for index, data in zip(pending, serializer.validated_data)
+        ]
+        created = {}
+        chunk_size = settings.EXPENSES_BULK_CHUNK_SIZE
+        for start in range(0, len(objects), chunk_size):
+            chunk = list(zip(pending[start:start + chunk_size], objects[start:start + chunk_size]))
+            created.update(self._bulk_insert(chunk, existing))
+        
+        results = []
+        for index, key in enumerate(keys):
+            if index in created:
+                obj, outcome = created[index], 'created'
+            elif key in existing:
+                obj, outcome = existing[key], 'replayed'
+            else:
+                obj, outcome = created[first_seen[key]], 'replayed'
+            results.append({
+                'index': index,
+                'status': outcome,
+                'expense': ExpenseSerializer(obj).data,
+            })
+        
+        return Response(
+            {
+                'created': len(created),
+                'replayed': len(items) - len(created),
+                'results': results,
+            },
+            status=status.HTTP_201_CREATED if created else status.HTTP_200_OK
+        )
+    
+    def _bulk_insert(self, chunk, existing):
+        """
+        Insert one chunk of (index, Expense) pairs in its own transaction.
+        If a concurrent request claimed one of the keys after our lookup,
+        reload those rows into ``existing`` and insert the remainder.
+        """
+        try:
+            with transaction.atomic():
+                Expense.objects.bulk_create([obj for _, obj in chunk])
+            return dict(chunk)
+        except IntegrityError:
+            keys = {obj.idempotency_key for _, obj in chunk if obj.idempotency_key}
+            existing.update(Expense.objects.in_bulk(keys, field_name='idempotency_key'))
+            remaining = [(index, obj) for index, obj in chunk if obj.idempotency_key not in existing]
+            with transaction.atomic():
+                Expense.objects.bulk_create([obj for _, obj in remaining])
+            return dict(remaining)
+    
+    @action(detail=False, methods=['delete'], url_path='bulk-delete')
+    def bulk_delete(self, request):
+        """
+        Delete every expense matching the list filters (all of them when no
+        filter is given) in one request.
+        Rows go in chunks of EXPENSES_DELETE_CHUNK_SIZE ids, each deleted with
+        one DELETE ... WHERE id IN (...) in its own short transaction, so a
+        large reset never holds the write lock or the id list for long.
+        """
+        queryset = filter_expenses(request.query_params).order_by()
+        chunk_size = settings.EXPENSES_DELETE_CHUNK_SIZE
+        deleted = 0
+        while True:
+            with transaction.atomic():
+                ids = list(queryset.values_list('id', flat=True)[:chunk_size])
+                if ids:
+                    deleted += Expense.objects.filter(id__in=ids).delete()[0]
+            if len(ids) < chunk_size:
+                break
+        return Response({'deleted': deleted}, status=status.HTTP_200_OK)
+    
+    @cached_response
+    @conditional_on_expenses
+    def list(self, request, *args, **kwargs):
+        """
+        List the filtered expenses.
+        With EXPENSES_FAST_LIST, rows are fetched as values_list() tuples of
+        the serializer's fields and formatted with each field's
+        to_representation, skipping per-row serializer instances.
+        """
+        if not settings.EXPENSES_FAST_LIST:
+            return super().list(request, *args, **kwargs)
+        
+        serializer = self.get_serializer()
+        fields = list(serializer.fields)
+        sources = [field.source for field in serializer.fields.values()]
+        queryset = self.filter_queryset(self.get_queryset())
+        # Named rows carrying every ordering column (e.g. search_rank), so
+        # keyset pagination can read the cursor; serialize_rows ignores extras
+        ordering = [name.lstrip('-') for name in queryset.query.order_by]
+        extra = [name for name in ordering if name not in sources]
+        queryset = queryset.values_list(*sources, *extra, named=True)
+        page = self.paginate_queryset(queryset)
+        data = serialize_rows(queryset if page is None else page, fields, get_converters(serializer, fields))
+        if page is not None:
+            return self.get_paginated_response(data)
+        return Response(data)
+    
     @action(detail=False, methods=['get'])
+    @cached_response
+    @conditional_on_expenses
     def total(self, request):
         """Get the total sum of expenses in the current filtered view."""
+        rollups = self.get_rollup_queryset()
+        if rollups is not None:
+            totals = rollups.aggregate(total=Sum('total'), count=Sum('count'))
+            return Response({
+                'total': format_amount(totals['total']),
+                'currency': '₹',
+                'count': totals['count'] or 0
+            })
+        
+        totals = self.get_queryset().order_by().aggregate(total=Sum('amount'), count=Count('id'))
+        return Response({
+            'total': format_amount(totals['total']),
+            'currency': '₹',
+            'count': totals['count']
+        })
+    
+    @action(detail=False, methods=['get'])
+    @cached_response
+    def summary(self, request):
+        """
+        Dashboard analytics for the current filtered view.
+        Count, sum, average and the per-category, per-day and per-month
+        series are all derived from one query grouped by (date, category),
+        read from the rollup where possible, so the work is
+        O(days x categories) rather than O(rows).
+        """
         queryset = self.get_queryset()
-        total = queryset.aggregate(Sum('amount'))['amount__sum'] or Decimal('0.00')
+        rollups = self.get_rollup_queryset()
+        if rollups is not None:
+            groups = rollups.values('date', 'category', 'count', 'total').order_by('date', 'category')
+        else:
+            groups = (
+                queryset.order_by()
+                .values('date', 'category')
+                .annotate(count=Count('id'), total=Sum('amount'))
+                .order_by('date', 'category')
+            )
+        
+        count, total = 0, Decimal('0.00')
+        by_category, by_day, by_month = {}, {}, {}
+        for group in groups:
+            month = group['date'].strftime('%Y-%m')
+            for series, key in ((by_category, group['category']),
+                                (by_day, group['date'].isoformat()),
+                                (by_month, month)):
+                bucket = series.setdefault(key, [0, Decimal('0.00')])
+                bucket[0] += group['count']
+                bucket[1] += group['total']
+            count += group['count']
+            total += group['total']
+        
+        average = total / count if count else None
+        recent = self.get_serializer(queryset.order_by('-date', '-created_at', '-id')[:5], many=True)
         return Response({
-            'total': str(total),
+            'count': count,
+            'total': format_amount(total),
+            'average': format_amount(average),
             'currency': '₹',
-            'count': queryset.count()
+            'by_category': [
+                {'category': key, 'count': n, 'total': format_amount(amount)}
+                for key, (n, amount) in sorted(by_category.items())
+            ],
+            'by_day': [
+                {'date': key, 'count': n, 'total': format_amount(amount)}
+                for key, (n, amount) in by_day.items()
+            ],
+            'by_month': [
+                {'month': key, 'count': n, 'total': format_amount(amount)}
+                for key, (n, amount) in by_month.items()
+            ],
+            'recent': recent.data,
+        })
+    
+    @action(detail=False, methods=['get'], renderer_classes=[FastJSONRenderer, CSVRenderer, NDJSONRenderer])
+    def export(self, request):
+        """
+        Stream every expense in the current filtered view as CSV or NDJSON.
+        Choose the format with ?output=csv or ?output=ndjson, or with an
+        Accept header of text/csv or application/x-ndjson; CSV otherwise.
+        Rows are read with a chunked iterator, so memory use stays flat.
+        """
+        accepted = request.accepted_renderer.format
+        output = request.query_params.get('output') or (accepted if accepted in EXPORT_FORMATS else 'csv')
+        if output not in EXPORT_FORMATS:
+            raise ValidationError({'output': f'Must be one of: {", ".join(EXPORT_FORMATS)}.'})
+        stream, content_type = EXPORT_FORMATS[output]
+        
+        fields = ExpenseSerializer.Meta.fields
+        chunk_size = settings.EXPENSES_EXPORT_CHUNK_SIZE
+        rows = self.get_queryset().values_list(*fields).iterator(chunk_size=chunk_size)
+        content = stream(rows, fields, get_converters(ExpenseSerializer(), fields))
+        if isinstance(request._request, ASGIRequest):
+            content = iterate_async(content, chunk_size)
+        response = StreamingHttpResponse(content, content_type=content_type)
+        response['Content-Disposition'] = f'attachment; filename="expenses.{output}"'
+        return response
+    
+    @action(detail=False, methods=['get'])
+    def changes(self, request):
+        """
+        Expenses created, modified or deleted after the ``since`` watermark,
+        oldest first, for clients that keep a local copy.
+        Without ``since`` the whole ledger is returned (in pages). Pass the
+        response's ``watermark`` as ``since`` next time; ``next`` links to
+        the following page while ``has_more`` is true. A watermark from
+        before the newest pruned tombstone gets 410 Gone: the client may
+        have missed deletions and has to start over without ``since``.
+        """
+        since = request.query_params.get('since')
+        position = decode_watermark(since) if since else None
+        if position is not None and is_expired(position):
+            return Response(
+                {'detail': 'Deletions after this watermark have been pruned; resync without since.'},
+                status=status.HTTP_410_GONE
+            )
+        entries, has_more, end = changes_since(position, KeysetPagination().get_page_size(request))
+        watermark = encode_watermark(*end)
+        return Response({
+            'watermark': watermark,
+            'has_more': has_more,
+            'next': replace_query_param(request.build_absolute_uri(), 'since', watermark) if has_more else None,
+            'results': serialize_changes(entries),
         })
     
+    @action(detail=False, methods=['get'], url_path='cache-stats')
+    def cache_stats(self, request):
+        """Get this worker's response cache hit/miss counters."""
+        return Response(cache_stats())
+    
     @action(detail=False, methods=['get'])
+    @cached_response
     def categories(self, request):
         """Get available categories."""
         categories = [{'value': value, 'label': label} 
@@ -77,19 +77,21 @@ sample_expenses = [
 ]
 
 print("Creating sample expenses...")
+# One query for the rows that already exist, one bulk INSERT for the rest
+existing = set(
+    Expense.objects.filter(
+        description__in=[exp['description'] for exp in sample_expenses]
+    ).values_list('description', 'date')
+)
+missing = []
 for exp_data in sample_expenses:
-    expense, created = Expense.objects.get_or_create(
-        description=exp_data['description'],
-        date=exp_data['date'],
-        defaults={
-            'amount': exp_data['amount'],
-            'category': exp_data['category']
-        }
-    )
-    if created:
-        print(f"✓ Created: {exp_data['category']}: ₹{exp_data['amount']} - {exp_data['description']}")
-    else:
+    if (exp_data['description'], exp_data['date']) in existing:
         print(f"✗ Already exists: {exp_data['description']}")
+    else:
+        missing.append(Expense(**exp_data))
+        print(f"✓ Created: {exp_data['category']}: ₹{exp_data['amount']} - {exp_data['description']}")
+Expense.objects.bulk_create(missing)
 
 print("\nDone! Sample data loaded successfully.")
 print(f"Total expenses: {Expense.objects.count()}")
+print("For load-testing volumes use: python manage.py seed_expenses --count 1000000")
@@ -0,0 +1,67 @@
+"""
+HTTP client for the Expense Tracker API, used by the Streamlit frontend.
+
+One requests.Session is shared by every call, so connections are kept alive
+and reused, transient failures (connection errors, 429/502/503/504) are
+retried with backoff on idempotent methods, and responses may be compressed
+with any encoding urllib3 can decode here (brotli/zstd when installed).
+The ledger itself is loaded through the changes feed, see expense_store.
+"""
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.request import ACCEPT_ENCODING
+from urllib3.util.retry import Retry
+
+DEFAULT_TIMEOUT = 10
+DEFAULT_WORKERS = 8
+DEFAULT_RETRIES = 3
+
+
+def build_session(pool_size=DEFAULT_WORKERS, retries=DEFAULT_RETRIES, backoff_factor=0.3):
+    """A Session with a connection pool of ``pool_size`` per host and retries."""
+    retry = Retry(
+        total=retries,
+        backoff_factor=backoff_factor,
+        status_forcelist=(429, 502, 503, 504),
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_size, max_retries=retry)
+    session = requests.Session()
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    session.headers.update({'Accept': 'application/json', 'Accept-Encoding': ACCEPT_ENCODING})
+    return session
+
+
+class ExpenseClient:
+    """
+    Thin wrapper around the expenses API.
+    Safe to share between threads (and Streamlit sessions): the only state
+    is the Session's connection pool.
+    """
+
+    def __init__(self, base_url, timeout=DEFAULT_TIMEOUT, workers=DEFAULT_WORKERS,
+                 retries=DEFAULT_RETRIES, session=None):
+        self.base_url = base_url.rstrip('/')
+        self.timeout = timeout
+        self.workers = workers
+        self.session = session or build_session(pool_size=workers, retries=retries)
+
+    def url(self, path):
+        return path if '://' in path else f"{self.base_url}/{path.lstrip('/')}"
+
+    def request(self, method, path, **kwargs):
+        kwargs.setdefault('timeout', self.timeout)
+        return self.session.request(method, self.url(path), **kwargs)
+
+    def get_json(self, path, params=None):
+        """GET ``path`` and return the decoded body, raising HTTPError on failure."""
+        response = self.request('GET', path, params=params)
+        response.raise_for_status()
+        return response.json()
+
+    def post(self, path, json=None, headers=None):
+        return self.request('POST', path, json=json, headers=headers)
+
+    def delete(self, path, params=None):
+        return self.request('DELETE', path, params=params)
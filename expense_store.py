@@ -0,0 +1,233 @@
+"""
+Local copy of the expense ledger for the Streamlit client.
+
+Rows are kept in an on-disk SQLite file and, while a session runs, in a
+typed pandas DataFrame indexed by expense id. refresh() pulls only what
+changed since the stored watermark from the API's changes feed, and writes
+made through this client are applied in place with upsert()/remove(), so a
+rerun never refetches the ledger or rebuilds the frame. Filtered views and
+summaries are memoized per store version: any change bumps the version and
+invalidates exactly those results, nothing else.
+"""
+import sqlite3
+import time
+from decimal import Decimal
+
+import numpy as np
+import pandas as pd
+import requests
+
+CATEGORIES = ["food", "transport", "entertainment", "utilities", "shopping", "health", "other"]
+FIELDS = ["amount_cents", "category", "description", "date", "created_at"]
+PAGE_SIZE = 5000
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS expenses (
+    id INTEGER PRIMARY KEY,
+    amount_cents INTEGER NOT NULL,
+    category TEXT NOT NULL,
+    description TEXT NOT NULL,
+    date TEXT NOT NULL,
+    created_at TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+"""
+
+
+def to_cents(amount):
+    """API amounts are decimal strings; keep money exact as integer cents."""
+    return int(Decimal(str(amount)).scaleb(2).to_integral_value())
+
+
+def from_cents(cents):
+    """Integer cents as the API's two-decimal amount string."""
+    return str(Decimal(int(cents)).scaleb(-2))
+
+
+def to_row(expense):
+    """An API expense dict as an (id, *FIELDS) tuple."""
+    return (
+        expense["id"], to_cents(expense["amount"]), expense["category"],
+        expense["description"], expense["date"], expense["created_at"],
+    )
+
+
+def to_frame(rows):
+    """Build the typed frame from (id, *FIELDS) tuples or a same-shaped frame."""
+    frame = pd.DataFrame.from_records(rows, columns=["id", *FIELDS]) if not isinstance(rows, pd.DataFrame) else rows
+    return pd.DataFrame(
+        {
+            "amount_cents": frame["amount_cents"].astype("int64"),
+            "category": pd.Categorical(frame["category"], categories=CATEGORIES),
+            "description": frame["description"].astype("string"),
+            "date": pd.to_datetime(frame["date"], format="ISO8601"),
+            "created_at": pd.to_datetime(frame["created_at"], format="ISO8601", utc=True),
+        },
+    ).set_axis(pd.Index(frame["id"].astype("int64"), name="id"))
+
+
+def sort_frame(frame):
+    """Order rows by (date, created_at, id), the API's date_asc order."""
+    return frame.iloc[np.lexsort((frame.index.values, frame["created_at"].values, frame["date"].values))]
+
+
+class ExpenseStore:
+    """
+    The ledger as seen by one Streamlit session.
+    ``source`` identifies the API; a file written for another API is wiped.
+    """
+
+    def __init__(self, path, client, source=""):
+        self.client = client
+        self.db = sqlite3.connect(path, timeout=10, check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode = WAL")
+        self.db.executescript(SCHEMA)
+        if self._meta("source") not in (None, source):
+            self._write([], [], None, wipe=True)
+        self._set_meta("source", source)
+        self.db.commit()
+        self.watermark = self._meta("watermark")
+        self.frame = sort_frame(to_frame(pd.read_sql_query(f"SELECT id, {', '.join(FIELDS)} FROM expenses", self.db)))
+        self.version = 0
+        self.synced_at = None
+        self._views = {}
+
+    def _meta(self, key):
+        row = self.db.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def _set_meta(self, key, value):
+        self.db.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, value))
+
+    def _write(self, rows, deleted_ids, watermark, wipe=False):
+        """Persist upserts, deletions and the watermark in one transaction."""
+        with self.db:
+            if wipe:
+                self.db.execute("DELETE FROM expenses")
+            self.db.executemany("DELETE FROM expenses WHERE id = ?", [(i,) for i in deleted_ids])
+            self.db.executemany(
+                f"INSERT OR REPLACE INTO expenses (id, {', '.join(FIELDS)}) VALUES (?, ?, ?, ?, ?, ?)", rows
+            )
+            self._set_meta("watermark", watermark)
+
+    def _apply(self, rows, deleted_ids, watermark, wipe=False):
+        self._write(rows, deleted_ids, watermark, wipe=wipe)
+        frame = self.frame.iloc[:0] if wipe else self.frame
+        replaced = frame.index.intersection([row[0] for row in rows] + list(deleted_ids))
+        if len(replaced):
+            frame = frame.drop(index=replaced)
+        if rows:
+            # Kept sorted so views only mask (and reverse for newest first)
+            frame = sort_frame(pd.concat([frame, to_frame(rows)]))
+        self.frame = frame
+        self.watermark = watermark
+        self.version += 1
+        self._views.clear()
+
+    def upsert(self, expenses):
+        """Apply expenses returned by the API (e.g. after a create) in place."""
+        if expenses:
+            self._apply([to_row(expense) for expense in expenses], [], self.watermark)
+
+    def remove(self, ids=None):
+        """Drop the given expenses, or every expense when ``ids`` is None."""
+        if ids is None:
+            self._apply([], [], self.watermark, wipe=True)
+        elif ids:
+            self._apply([], ids, self.watermark)
+
+    def refresh(self, max_age=0.0):
+        """
+        Pull changes since the watermark unless the last sync is younger than
+        ``max_age`` seconds. Returns the number of changes applied. If the
+        server no longer has our watermark (410), start over from scratch.
+        """
+        if self.synced_at is not None and time.monotonic() - self.synced_at < max_age:
+            return 0
+        since = self.watermark
+        try:
+            changes, watermark = self._pull(since)
+        except requests.HTTPError as error:
+            if since is None or error.response is None or error.response.status_code != 410:
+                raise
+            since = None
+            changes, watermark = self._pull(None)
+        # A pull without a watermark is a full snapshot and replaces every
+        # local row, including ones only ever upserted here
+        wipe = since is None
+        self.synced_at = time.monotonic()
+        if not changes and not wipe:
+            if watermark != self.watermark:
+                # Nothing changed, so the frame and memoized views stay valid
+                with self.db:
+                    self._set_meta("watermark", watermark)
+                self.watermark = watermark
+        else:
+            # Later entries for the same id supersede earlier ones
+            latest = {}
+            for entry in changes:
+                latest[entry["id"]] = entry
+            rows = [to_row(entry) for entry in latest.values() if not entry.get("deleted")]
+            deleted = [entry["id"] for entry in latest.values() if entry.get("deleted")]
+            self._apply(rows, deleted, watermark, wipe=wipe)
+        return len(changes)
+
+    def _pull(self, since):
+        params = {"page_size": PAGE_SIZE}
+        if since:
+            params["since"] = since
+        page = self.client.get_json("expenses/changes/", params)
+        changes = list(page["results"])
+        while page["has_more"]:
+            page = self.client.get_json(page["next"])
+            changes.extend(page["results"])
+        return changes, page["watermark"] or since
+
+    def query(self, params=None):
+        """The frame filtered and sorted like the API's list endpoint."""
+        key = ("query", tuple(sorted((params or {}).items())))
+        if key not in self._views:
+            self._views[key] = self._query(params or {})
+        return self._views[key]
+
+    def _query(self, params):
+        frame = self.frame
+        mask = pd.Series(True, index=frame.index)
+        categories = [c for c in params.get("category", "").split(",") if c and c != "all"]
+        if categories:
+            mask &= frame["category"].isin(categories)
+        if params.get("date_from"):
+            mask &= frame["date"] >= pd.Timestamp(params["date_from"])
+        if params.get("date_to"):
+            mask &= frame["date"] <= pd.Timestamp(params["date_to"])
+        if params.get("min_amount"):
+            mask &= frame["amount_cents"] >= to_cents(params["min_amount"])
+        if params.get("max_amount"):
+            mask &= frame["amount_cents"] <= to_cents(params["max_amount"])
+        view = frame[mask] if not mask.all() else frame
+        return view if params.get("sort") == "date_asc" else view.iloc[::-1]
+
+    def summary(self, params=None):
+        """
+        count, total, average and by_category as the API's summary endpoint
+        returns them (amounts as decimal strings), computed locally. ``recent``
+        is a frame of the five newest rows rather than a list of dicts.
+        """
+        key = ("summary", tuple(sorted((params or {}).items())))
+        if key not in self._views:
+            view = self.query(params)
+            total = int(view["amount_cents"].sum())
+            count = len(view)
+            by_category = view.groupby("category", observed=True)["amount_cents"].agg(["count", "sum"])
+            newest = view.iloc[::-1] if (params or {}).get("sort") == "date_asc" else view
+            self._views[key] = {
+                "count": count,
+                "total": from_cents(total),
+                "average": str((Decimal(total).scaleb(-2) / (count or 1)).quantize(Decimal("0.01"))),
+                "by_category": [
+                    {"category": category, "count": int(n), "total": from_cents(cents)}
+                    for category, (n, cents) in by_category.sort_index(key=lambda index: index.astype(str)).iterrows()
+                ],
+                "recent": newest.head(5),
+            }
+        return self._views[key]
@@ -1,8 +1,11 @@
 import streamlit as st
-import requests
 from datetime import datetime, timedelta
-import pandas as pd
+import hashlib
 import os
+import tempfile
+
+from expense_client import ExpenseClient
+from expense_store import CATEGORIES, ExpenseStore
 
 # ============================================================================
 # CONFIGURATION
@@ -11,6 +14,13 @@ API_URL = st.secrets.get("API_URL") if hasattr(st, "secrets") and st.secrets els
 if not API_URL:
     API_URL = "https://expense-tracker-p79n.onrender.com/api"
 
+# On-disk copy of the ledger, one file per API
+STORE_PATH = os.getenv("EXPENSE_STORE_PATH") or os.path.join(
+    tempfile.gettempdir(), f"expense-store-{hashlib.sha1(API_URL.encode()).hexdigest()[:12]}.sqlite3"
+)
+# Seconds between background syncs with the API's changes feed
+SYNC_INTERVAL = float(os.getenv("EXPENSE_SYNC_INTERVAL", "60"))
+
 st.set_page_config(
     page_title="Expense Tracker",
     page_icon="💰",
@@ -25,32 +35,23 @@ st.markdown("Track your expenses easily and efficiently")
 # HELPER FUNCTIONS
 # ============================================================================
 
-@st.cache_data(ttl=60)
-def load_expenses_cached():
-    """Fetch expenses from Django API"""
+@st.cache_resource
+def get_client():
+    """One API client (and connection pool) shared by every session"""
+    return ExpenseClient(API_URL)
+
+def get_store():
+    """This session's local ledger: on-disk SQLite plus a pandas frame"""
+    if "expense_store" not in st.session_state:
+        st.session_state["expense_store"] = ExpenseStore(STORE_PATH, get_client(), source=API_URL)
+    return st.session_state["expense_store"]
+
+def sync_expenses(force=False):
+    """Pull only what changed on the server since the last sync"""
     try:
-        url = f"{API_URL}/expenses/"
-        response = requests.get(url, timeout=10, headers={"Accept": "application/json"})
-        
-        if response.status_code == 200:
-            data = response.json()
-            # Handle paginated response
-            if isinstance(data, dict) and "results" in data:
-                return data["results"]
-            # Handle direct list response
-            elif isinstance(data, list):
-                return data
-            else:
-                return []
-        else:
-            return []
+        get_store().refresh(max_age=0 if force else SYNC_INTERVAL)
     except Exception as e:
-        st.error(f"❌ Cannot load expenses: {str(e)}")
-        return []
-
-def load_expenses():
-    """Load expenses with caching"""
-    return load_expenses_cached()
+        st.warning(f"⚠️ Showing saved data; cannot reach the API: {str(e)}")
 
 def add_expense(description, amount, category, date, idempotency_key):
     """Add expense via Django API"""
@@ -63,14 +64,11 @@ def add_expense(description, amount, category, date, idempotency_key):
         }
         headers = {"Idempotency-Key": idempotency_key}
         
-        response = requests.post(
-            f"{API_URL}/expenses/",
-            json=payload,
-            headers=headers,
-            timeout=10
-        )
+        response = get_client().post("expenses/", json=payload, headers=headers)
         
         if response.status_code in [200, 201]:
+            # Apply the new row in place instead of refetching the ledger
+            get_store().upsert([response.json()])
             return True, "✅ Expense added successfully!"
         else:
             try:
@@ -88,34 +86,23 @@ def add_expense(description, amount, category, date, idempotency_key):
 def delete_expense(expense_id):
     """Delete a single expense via Django API"""
     try:
-        response = requests.delete(
-            f"{API_URL}/expenses/{expense_id}/",
-            timeout=10
-        )
+        response = get_client().delete(f"expenses/{expense_id}/")
         return response.status_code in [200, 204]
     except Exception as e:
         st.error(f"❌ Error deleting expense: {str(e)}")
         return False
 
 def reset_all_expenses():
-    """Delete all expenses for a fresh start"""
+    """Delete all expenses for a fresh start, in one server-side request"""
     try:
-        # Get all expenses
-        expenses = load_expenses_cached()
-        
-        if not expenses:
+        response = get_client().delete("expenses/bulk-delete/")
+        if response.status_code != 200:
+            return False, f"❌ Error {response.status_code}: {response.text}"
+        deleted_count = response.json().get("deleted", 0)
+        get_store().remove()
+        if not deleted_count:
             return True, "✅ No expenses to clear!"
-        
-        # Delete each expense
-        deleted_count = 0
-        for exp in expenses:
-            if delete_expense(exp.get("id")):
-                deleted_count += 1
-        
-        if deleted_count == len(expenses):
-            return True, f"✅ Cleared {deleted_count} expense(s)! Ready for new user."
-        else:
-            return False, f"⚠️ Deleted {deleted_count}/{len(expenses)} expenses"
+        return True, f"✅ Cleared {deleted_count} expense(s)! Ready for new user."
     except Exception as e:
         return False, f"❌ Error resetting expenses: {str(e)}"
 
@@ -142,7 +129,7 @@ with st.sidebar:
         
         category = st.selectbox(
             "Category",
-            ["food", "transport", "entertainment", "utilities", "shopping", "health", "other"]
+            CATEGORIES
         )
         
         date = st.date_input(
@@ -162,11 +149,59 @@ with st.sidebar:
                 
                 if success:
                     st.success(message)
-                    st.cache_data.clear()
                     st.rerun()
                 else:
                     st.error(message)
     
+    # ====================================================================
+    # FILTERS (applied to the local ledger)
+    # ====================================================================
+    
+    st.divider()
+    st.header("🔍 Filters")
+    
+    selected_categories = st.multiselect(
+        "Categories",
+        CATEGORIES,
+        placeholder="All categories"
+    )
+    
+    use_dates = st.checkbox("Filter by date range")
+    date_range = ()
+    if use_dates:
+        today = datetime.now().date()
+        date_range = st.date_input(
+            "Date range",
+            value=(today - timedelta(days=30), today),
+            max_value=today
+        )
+    
+    amount_col1, amount_col2 = st.columns(2)
+    with amount_col1:
+        min_amount = st.number_input("Min amount", min_value=0.0, step=1.0, format="%.2f")
+    with amount_col2:
+        max_amount = st.number_input("Max amount (0 = any)", min_value=0.0, step=1.0, format="%.2f")
+    
+    sort_order = st.radio(
+        "Sort by Date",
+        ["Newest First", "Oldest First"],
+        horizontal=True
+    )
+    
+    filter_params = {"sort": "date_asc" if sort_order == "Oldest First" else "date_desc"}
+    if selected_categories:
+        filter_params["category"] = ",".join(selected_categories)
+    if len(date_range) == 2:
+        filter_params["date_from"] = date_range[0].isoformat()
+        filter_params["date_to"] = date_range[1].isoformat()
+    if min_amount > 0:
+        filter_params["min_amount"] = f"{min_amount:.2f}"
+    if max_amount > 0:
+        filter_params["max_amount"] = f"{max_amount:.2f}"
+    
+    if st.button("🔄 Sync now", use_container_width=True):
+        sync_expenses(force=True)
+    
     # ====================================================================
     # NEW USER / RESET SECTION
     # ====================================================================
@@ -181,7 +216,6 @@ with st.sidebar:
             
             if success:
                 st.success(message)
-                st.cache_data.clear()
                 st.rerun()
             else:
                 st.error(message)
@@ -190,14 +224,16 @@ with st.sidebar:
 # MAIN CONTENT - METRICS & DATA
 # ============================================================================
 
-# Load expenses
-expenses = load_expenses()
+# Filter the local ledger; views are memoized until the store changes
+sync_expenses()
+expenses = get_store().query(filter_params)
+summary = get_store().summary(filter_params)
 
-if expenses:
-    # Calculate metrics
-    total = sum(float(e.get("amount", 0)) for e in expenses)
-    count = len(expenses)
-    avg = total / count if count > 0 else 0
+if summary["count"]:
+    # Metrics are aggregated over the whole filtered view
+    total = float(summary["total"])
+    count = summary["count"]
+    avg = float(summary["average"])
     
     # Display metrics
     col1, col2, col3 = st.columns(3)
@@ -210,63 +246,24 @@ if expenses:
     
     st.divider()
     
-    # ====================================================================
-    # FILTERS
-    # ====================================================================
-    
-    col1, col2 = st.columns(2)
-    
-    with col1:
-        categories = ["All"] + sorted(list(set(e.get("category", "Other") for e in expenses)))
-        selected_category = st.multiselect(
-            "Filter by Category",
-            categories,
-            default=["All"]
-        )
-    
-    with col2:
-        sort_order = st.radio(
-            "Sort by Date",
-            ["Newest First", "Oldest First"],
-            horizontal=True
-        )
-    
-    # ====================================================================
-    # FILTER AND SORT
-    # ====================================================================
-    
-    if "All" in selected_category:
-        filtered_expenses = expenses
-    else:
-        filtered_expenses = [
-            exp for exp in expenses
-            if exp.get("category") in selected_category
-        ]
-    
-    if sort_order == "Oldest First":
-        filtered_expenses.sort(key=lambda x: x.get("date", ""))
-    else:
-        filtered_expenses.sort(key=lambda x: x.get("date", ""), reverse=True)
-    
     # ====================================================================
     # DISPLAY TABLE
     # ====================================================================
     
     st.subheader("📊 Your Expenses")
     
-    if filtered_expenses:
-        # Create DataFrame for better display
-        df = pd.DataFrame([
-            {
-                "Date": e.get("date", ""),
-                "Description": e.get("description", ""),
-                "Category": e.get("category", ""),
-                "Amount": f"${float(e.get('amount', 0)):.2f}"
-            }
-            for e in filtered_expenses
-        ])
+    if len(expenses):
+        df = expenses.assign(
+            Date=expenses["date"].dt.date,
+            Amount=expenses["amount_cents"] / 100
+        ).rename(columns={"description": "Description", "category": "Category"})
         
-        st.dataframe(df, use_container_width=True, hide_index=True)
+        st.dataframe(
+            df[["Date", "Description", "Category", "Amount"]],
+            use_container_width=True,
+            hide_index=True,
+            column_config={"Amount": st.column_config.NumberColumn(format="$%.2f")}
+        )
     else:
         st.info("📭 No expenses found for the selected filters")
     
@@ -280,11 +277,10 @@ if expenses:
     
     with col1:
         st.write("**Spending by Category**")
-        category_totals = {}
-        for exp in filtered_expenses:
-            cat = exp.get("category", "Other")
-            amt = float(exp.get("amount", 0))
-            category_totals[cat] = category_totals.get(cat, 0) + amt
+        category_totals = {
+            c["category"]: float(c["total"])
+            for c in summary["by_category"]
+        }
         
         if category_totals:
             st.bar_chart(category_totals)
@@ -293,18 +289,18 @@ if expenses:
     
     with col2:
         st.write("**Recent Expenses**")
-        recent = sorted(expenses, key=lambda x: x.get("date", ""), reverse=True)[:5]
-        
-        for exp in recent:
+        for exp in summary["recent"].itertuples():
             with st.container():
                 col_desc, col_cat, col_amt = st.columns([2, 1, 1])
                 with col_desc:
-                    st.caption(f"📝 {exp.get('description', 'N/A')}")
+                    st.caption(f"📝 {exp.description}")
                 with col_cat:
-                    st.caption(f"🏷️ {exp.get('category', 'N/A')}")
+                    st.caption(f"🏷️ {exp.category}")
                 with col_amt:
-                    st.caption(f"💵 ${float(exp.get('amount', 0)):.2f}")
+                    st.caption(f"💵 ${exp.amount_cents / 100:.2f}")
 
+elif len(filter_params) > 1:
+    st.info("📭 No expenses found for the selected filters")
 else:
     st.info("📭 No expenses found. Start by adding one in the sidebar!")
 
@@ -0,0 +1,119 @@
+"""
+Tests for expense_client against a local stub of the expenses API.
+Run with: python -m unittest test_expense_client
+"""
+import json
+import threading
+import time
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlencode, urlsplit
+
+import requests
+
+from expense_client import ExpenseClient
+
+ROWS = [{'id': index, 'amount': f'{index}.00'} for index in range(1, 5001)]
+
+
+class StubAPIHandler(BaseHTTPRequestHandler):
+    """Serves ROWS with page-number or cursor pagination like the real API."""
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        server = self.server
+        with server.lock:
+            server.requests += 1
+            server.clients.add(self.client_address)
+            fail = server.failures > 0
+            server.failures -= fail
+        time.sleep(server.delay)
+        if fail:
+            return self.send_json(503, {'detail': 'unavailable'})
+
+        parts = urlsplit(self.path)
+        params = {key: values[0] for key, values in parse_qs(parts.query).items()}
+        size = min(int(params.get('page_size', 100)), server.max_page_size)
+        if params.get('pagination') == 'cursor':
+            start = int(params.get('cursor', 0))
+            following = dict(params, cursor=start + size)
+            body = {
+                'next': f'http://{self.headers["Host"]}{parts.path}?{urlencode(following)}'
+                if start + size < len(server.rows) else None,
+                'previous': None,
+                'results': server.rows[start:start + size],
+            }
+            return self.send_json(200, body)
+
+        number = int(params.get('page', 1))
+        start = (number - 1) * size
+        if start and start >= len(server.rows):
+            return self.send_json(404, {'detail': 'Invalid page.'})
+        body = {
+            'count': len(server.rows),
+            'next': f'{parts.path}?page={number + 1}' if start + size < len(server.rows) else None,
+            'previous': None,
+            'results': server.rows[start:start + size],
+        }
+        self.send_json(200, body)
+
+    def send_json(self, status, body):
+        payload = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+
+class ExpenseClientTest(unittest.TestCase):
+    """Test connection pooling and retries of ExpenseClient."""
+
+    def setUp(self):
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), StubAPIHandler)
+        self.server.daemon_threads = True
+        self.server.lock = threading.Lock()
+        self.server.rows = ROWS
+        self.server.delay = 0.0
+        self.server.failures = 0
+        self.server.max_page_size = 10000
+        self.server.requests = 0
+        self.server.clients = set()
+        thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        thread.start()
+        self.client = ExpenseClient(f'http://127.0.0.1:{self.server.server_port}/api')
+        self.addCleanup(self.client.session.close)
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_connections_kept_alive(self):
+        """Sequential requests reuse one pooled connection."""
+        for number in range(1, 21):
+            self.assertEqual(self.client.get_json('/expenses/', {'page': number})['results'][0], ROWS[(number - 1) * 100])
+        self.assertEqual(self.server.requests, 20)
+        self.assertEqual(len(self.server.clients), 1)
+
+    def test_absolute_next_links(self):
+        """Absolute ``next`` links are requested as they are."""
+        first = self.client.get_json('/expenses/', {'pagination': 'cursor', 'page_size': 100})
+        second = self.client.get_json(first['next'])
+        self.assertEqual(second['results'], ROWS[100:200])
+
+    def test_transient_errors_retried(self):
+        """503s are retried on the shared session; persistent errors raise."""
+        self.client.session.adapters['http://'].max_retries.backoff_factor = 0
+        self.server.failures = 2
+        self.assertEqual(self.client.get_json('/expenses/')['results'], ROWS[:100])
+        self.server.failures = 100
+        with self.assertRaises(requests.HTTPError):
+            self.client.get_json('/expenses/')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,200 @@
+"""
+Tests for expense_store against an in-memory fake of the changes feed.
+Run with: python -m unittest test_expense_store
+"""
+import os
+import tempfile
+import time
+import unittest
+from urllib.parse import parse_qs, urlsplit
+
+import requests
+
+from expense_store import CATEGORIES, ExpenseStore
+
+
+def expense(expense_id, amount='10.00', category='food', day='2024-02-01', description=None):
+    return {
+        'id': expense_id, 'amount': amount, 'category': category,
+        'description': description or f'Item {expense_id}', 'date': day,
+        'created_at': f'2024-02-01T10:00:00.{expense_id:06d}Z', 'updated_at': '2024-02-01T10:00:00Z',
+    }
+
+
+class FakeFeed:
+    """Serves /expenses/changes/ from an append-only log; watermarks are log offsets."""
+
+    def __init__(self, page_size=None):
+        self.log = []
+        self.page_size = page_size
+        self.requests = 0
+        self.expired = False
+        self.offline = False
+
+    def get_json(self, path, params=None):
+        if self.offline:
+            raise requests.ConnectionError('offline')
+        self.requests += 1
+        params = dict(params or {})
+        params.update({key: values[0] for key, values in parse_qs(urlsplit(path).query).items()})
+        since = params.get('since')
+        if since and self.expired:
+            response = requests.Response()
+            response.status_code = 410
+            raise requests.HTTPError(response=response)
+        start = int(since) if since else 0
+        size = self.page_size or int(params.get('page_size', 100))
+        entries = self.log[start:start + size]
+        if not since:
+            entries = [entry for entry in entries if not entry.get('deleted')]
+        end = min(start + size, len(self.log))
+        has_more = end < len(self.log)
+        return {
+            'watermark': str(end),
+            'has_more': has_more,
+            'next': f'expenses/changes/?since={end}' if has_more else None,
+            'results': entries,
+        }
+
+
+class ExpenseStoreTest(unittest.TestCase):
+    """Test syncing, in-place writes and local views of ExpenseStore."""
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, 'store.sqlite3')
+        self.feed = FakeFeed()
+        self.feed.log = [
+            expense(1, '5.00', 'food', '2024-02-01'),
+            expense(2, '7.50', 'transport', '2024-02-03'),
+            expense(3, '2.25', 'food', '2024-02-02'),
+        ]
+
+    def _store(self, source='api'):
+        store = ExpenseStore(self.path, self.feed, source=source)
+        self.addCleanup(store.db.close)
+        return store
+
+    def test_sync_persists_and_reloads_offline(self):
+        """A synced ledger comes back from disk without touching the API."""
+        store = self._store()
+        self.assertEqual(store.refresh(), 3)
+        self.assertEqual(list(store.query({'sort': 'date_desc'}).index), [2, 3, 1])
+        self.feed.offline = True
+        reloaded = self._store()
+        self.assertEqual(list(reloaded.query({'sort': 'date_asc'}).index), [1, 3, 2])
+        self.assertEqual(reloaded.watermark, '3')
+        self.assertEqual(str(reloaded.frame['category'].dtype), 'category')
+        self.assertEqual(list(reloaded.frame['category'].cat.categories), CATEGORIES)
+        self.assertEqual(reloaded.frame['amount_cents'].tolist(), [500, 225, 750])
+
+    def test_delta_refresh(self):
+        """Only new log entries are pulled; later entries win for an id."""
+        store = self._store()
+        store.refresh()
+        self.feed.log += [
+            expense(1, '6.00', 'food', '2024-02-01', description='Edited'),
+            {'id': 2, 'deleted': True, 'updated_at': '2024-02-02T00:00:00Z'},
+            expense(4, '1.00', 'other', '2024-02-04'),
+            {'id': 4, 'deleted': True, 'updated_at': '2024-02-02T00:00:01Z'},
+        ]
+        self.feed.requests = 0
+        self.assertEqual(store.refresh(), 4)
+        self.assertEqual(self.feed.requests, 1)
+        self.assertEqual(sorted(store.frame.index), [1, 3])
+        self.assertEqual(store.frame.loc[1, 'description'], 'Edited')
+        self.assertEqual(store.refresh(), 0)
+        self.assertEqual(sorted(self._store().frame.index), [1, 3])
+
+    def test_snapshot_replaces_unsynced_rows(self):
+        """Rows upserted before the first sync do not outlive a server-side delete."""
+        self.feed.log = []
+        store = self._store()
+        store.upsert([expense(1)])
+        self.assertEqual(store.refresh(), 0)
+        self.assertEqual(list(store.frame.index), [])
+        self.assertEqual(store.watermark, '0')
+        self.feed.log = [expense(2)]
+        store.refresh()
+        self.assertEqual(list(store.frame.index), [2])
+
+    def test_refresh_throttled_and_paged(self):
+        """max_age skips recent syncs; multi-page feeds are followed."""
+        self.feed.page_size = 2
+        store = self._store()
+        store.refresh()
+        self.assertEqual(self.feed.requests, 2)
+        self.assertEqual(store.refresh(max_age=60), 0)
+        self.assertEqual(self.feed.requests, 2)
+
+    def test_expired_watermark_resyncs(self):
+        """A 410 from the feed replaces the local copy with a fresh snapshot."""
+        store = self._store()
+        store.refresh()
+        self.feed.log = [expense(9, '1.00')]
+        self.feed.expired = True
+        store.refresh()
+        self.assertEqual(list(store.frame.index), [9])
+
+    def test_upsert_and_remove_invalidate_views(self):
+        """Local writes apply in place and only drop memoized views."""
+        store = self._store()
+        store.refresh()
+        view = store.query({'sort': 'date_desc'})
+        self.assertIs(store.query({'sort': 'date_desc'}), view)
+        requests_before = self.feed.requests
+        store.upsert([expense(5, '3.00', 'health', '2024-02-05')])
+        self.assertEqual(self.feed.requests, requests_before)
+        self.assertEqual(list(store.query({'sort': 'date_desc'}).index), [5, 2, 3, 1])
+        self.assertEqual(sorted(self._store().frame.index), [1, 2, 3, 5])
+        store.remove([5])
+        self.assertEqual(sorted(store.frame.index), [1, 2, 3])
+        store.remove()
+        self.assertEqual(store.summary()['count'], 0)
+        self.assertEqual((store.summary()['total'], store.summary()['average']), ('0.00', '0.00'))
+
+    def test_filters_and_summary_match_api(self):
+        """Filters, sort and summary follow the API's semantics."""
+        store = self._store()
+        store.refresh()
+        self.assertEqual(list(store.query({'category': 'food', 'sort': 'date_asc'}).index), [1, 3])
+        self.assertEqual(list(store.query({'date_from': '2024-02-02', 'date_to': '2024-02-02'}).index), [3])
+        self.assertEqual(list(store.query({'min_amount': '5.00', 'max_amount': '7.50'}).index), [2, 1])
+        summary = store.summary({'category': 'food,transport'})
+        self.assertEqual((summary['count'], summary['total'], summary['average']), (3, '14.75', '4.92'))
+        self.assertEqual(
+            summary['by_category'],
+            [{'category': 'food', 'count': 2, 'total': '7.25'}, {'category': 'transport', 'count': 1, 'total': '7.50'}]
+        )
+        self.assertEqual(list(summary['recent'].index), [2, 3, 1])
+
+    def test_other_api_wipes_store(self):
+        """A file synced from another API is not reused."""
+        self._store().refresh()
+        self.assertEqual(len(self._store(source='other').frame), 0)
+
+    def test_write_then_rerun_is_fast(self):
+        """With 100k expenses, a write plus the next dashboard views take milliseconds."""
+        self.feed.log = [
+            expense(i, f'{i % 500}.99', CATEGORIES[i % 7], f'2024-{i % 12 + 1:02d}-{i % 28 + 1:02d}')
+            for i in range(1, 100001)
+        ]
+        self.feed.page_size = 50000
+        store = self._store()
+        store.refresh()
+        params = {'sort': 'date_desc', 'category': 'food,health'}
+        store.summary(params)
+        started = time.perf_counter()
+        store.upsert([expense(100001, '4.00', 'food', '2024-06-01')])
+        store.query(params)
+        store.summary(params)
+        self.assertLess(time.perf_counter() - started, 0.25)
+        started = time.perf_counter()
+        store.query(params)
+        store.summary(params)
+        self.assertLess(time.perf_counter() - started, 0.001)
+
+
+if __name__ == '__main__':
+    unittest.main()